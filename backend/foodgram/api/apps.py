@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     name = 'api'
     verbose_name = 'API проекта'
+
+    def ready(self):
+        from foodgram import checks  # noqa: F401
+        from foodgram.cache import connect_invalidation
+
+        from . import signals  # noqa: F401
+        connect_invalidation()
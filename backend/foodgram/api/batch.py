@@ -0,0 +1,97 @@
+import contextvars
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.db import connections
+from django.http import QueryDict
+from django.urls import Resolver404, resolve
+from foodgram.middleware import call_with_replica
+from rest_framework.response import Response
+
+BATCH_PREFIX = '/api/'
+
+logger = logging.getLogger(__name__)
+
+
+def make_subrequest(request, url):
+    """
+    Копия исходного запроса для внутреннего GET по адресу url.
+
+    Пользователь и токен передаются через _force_auth_*, поэтому
+    вложенные вьюсеты не проходят аутентификацию повторно.
+    """
+    parts = urlsplit(url)
+    subrequest = copy.copy(request._request)
+    subrequest.method = 'GET'
+    subrequest.path = subrequest.path_info = parts.path
+    subrequest.GET = QueryDict(parts.query)
+    subrequest.META = {**request.META, 'REQUEST_METHOD': 'GET',
+                       'PATH_INFO': parts.path, 'QUERY_STRING': parts.query}
+    if request.user.is_authenticated:
+        subrequest._force_auth_user = request.user
+        subrequest._force_auth_token = request.auth
+    return subrequest
+
+
+def get_body(response):
+    if isinstance(response, Response):
+        return response.data
+    if response.status_code == 304 or response.streaming:
+        return None
+    return response.content.decode(response.charset)
+
+
+def dispatch(request, url, batch_path):
+    parts = urlsplit(url)
+    if (parts.scheme or parts.netloc
+            or not parts.path.startswith(BATCH_PREFIX)
+            or parts.path == batch_path):
+        return {'url': url, 'status': 400,
+                'body': {'error': 'Недопустимый адрес.'}}
+    try:
+        match = resolve(parts.path)
+    except Resolver404:
+        return {'url': url, 'status': 404, 'body': None}
+    subrequest = make_subrequest(request, url)
+    subrequest.resolver_match = match
+    try:
+        response = call_with_replica(
+            subrequest, match.func,
+            lambda: match.func(subrequest, *match.args, **match.kwargs)
+        )
+    except Exception:
+        logger.exception('Ошибка подзапроса %s', url)
+        return {'url': url, 'status': 500, 'body': None}
+    result = {'url': url, 'status': response.status_code,
+              'body': get_body(response)}
+    if response.has_header('ETag'):
+        result['etag'] = response['ETag']
+    return result
+
+
+def run_in_thread(context, func, *args):
+    try:
+        return context.run(func, *args)
+    finally:
+        connections.close_all()
+
+
+def dispatch_batch(request, urls, workers=1):
+    """
+    Выполняет GET-подзапросы urls и возвращает их ответы в том же
+    порядке. Каждый подзапрос читает с реплики или основной базы по своей
+    вьюхе. При workers > 1 подзапросы идут параллельно, и каждый поток
+    открывает свои соединения с базами.
+    """
+    batch_path = request.path
+    if workers <= 1 or len(urls) == 1:
+        return [dispatch(request, url, batch_path) for url in urls]
+    with ThreadPoolExecutor(max_workers=min(workers, len(urls))) as pool:
+        futures = [
+            pool.submit(run_in_thread, contextvars.copy_context(), dispatch,
+                        request, url, batch_path)
+            for url in urls
+        ]
+        return [future.result() for future in futures]
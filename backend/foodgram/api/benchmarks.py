@@ -0,0 +1,75 @@
+import random
+import timeit
+import tracemalloc
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest
+from recipe.models import AmountIngredient, Ingredient, Recipe, Tag
+from rest_framework.request import Request
+from users.models import User
+
+
+def make_request(user=None, query=None):
+    """
+    Создает GET-запрос для контекста сериализаторов вне HTTP-цикла.
+    """
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.META.update(SERVER_NAME='localhost', SERVER_PORT='80')
+    for key, value in (query or {}).items():
+        http_request.GET[key] = value
+    request = Request(http_request)
+    request.user = user or AnonymousUser()
+    return request
+
+
+def measure(func, repeat=10):
+    """
+    Возвращает лучшее время вызова func в секундах и пик памяти в байтах.
+    """
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def seed_recipes(count, ingredients_per_recipe=8, batch_size=5000):
+    """
+    Создает count синтетических рецептов для замеров. Вызывать внутри
+    транзакции, которая затем откатывается.
+    """
+    author, _ = User.objects.get_or_create(
+        email='benchmark@foodgram.local',
+        defaults={'username': 'benchmark', 'first_name': 'benchmark',
+                  'last_name': 'benchmark'}
+    )
+    tags = list(Tag.objects.exclude(bit=None))
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+    through = Recipe.tags.through
+    for start in range(0, count, batch_size):
+        numbers = range(start, min(start + batch_size, count))
+        recipe_tags = [random.sample(tags, random.randint(1, len(tags)))
+                       for _ in numbers]
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'Рецепт {number}',
+                   text='Описание рецепта ' * 20, cooking_time=30,
+                   tags_mask=Tag.get_mask(chosen))
+            for number, chosen in zip(numbers, recipe_tags)
+        )
+        through.objects.bulk_create(
+            through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe, chosen in zip(recipes, recipe_tags)
+            for tag in chosen
+        )
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(recipe_id=recipe.id, ingredient_id=ingredient_id,
+                             amount=random.randint(1, 500))
+            for recipe in recipes
+            for ingredient_id in random.sample(ingredient_ids,
+                                               ingredients_per_recipe)
+        )
+    return author
@@ -0,0 +1,37 @@
+import threading
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы с одинаковым ключом: функция
+    выполняется один раз, остальные потоки ждут ее результат.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """
+        Возвращает (результат, был ли вызов объединен с уже идущим).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'event': threading.Event()}
+        if not leader:
+            call['event'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result'], True
+        try:
+            call['result'] = func()
+        except Exception as error:
+            call['error'] = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['event'].set()
+        return call['result'], False
@@ -0,0 +1,130 @@
+from django.contrib.auth.models import AnonymousUser
+from foodgram.cache import namespace
+from recipe.models import Recipe
+
+from .fast_serializers import FIELD_VALUES, FastRecipeSerializer
+
+VIEWER_FIELDS = ('is_favorited', 'is_in_shopping_cart')
+PUBLIC_FIELDS = tuple(
+    field for field in FIELD_VALUES if field not in VIEWER_FIELDS
+)
+
+
+def get_fragment_key(recipe_id, updated_at):
+    return f'{recipe_id}:{updated_at.timestamp()}'
+
+
+class RecipeFragments:
+    """
+    Собирает представления рецептов из общих для всех пользователей
+    публичных фрагментов и флагов текущего пользователя.
+
+    Фрагмент — ответ для анонимного пользователя без флагов, ключ
+    включает updated_at, поэтому правка рецепта делает его фрагмент
+    недействительным. Флаги избранного, корзины и подписки на авторов
+    страницы выбираются одним запросом.
+
+    При промахе запрос с выбором полей (?fields=, ?omit=) строит
+    представление только из выбранных полей и не кэширует его, чтобы
+    невыбранные поля не запрашивались из базы; полные фрагменты
+    кэшируются запросами без выбора полей.
+    """
+
+    def __init__(self, rows, context=None):
+        self.rows = list(rows)
+        self.context = context or {}
+        self.fields = self.context.get('fields')
+        if self.fields is None:
+            self.fields = tuple(FIELD_VALUES)
+
+    @property
+    def public_fields(self):
+        return tuple(
+            field for field in self.fields if field not in VIEWER_FIELDS
+        )
+
+    @staticmethod
+    def build(recipe_ids, fields=PUBLIC_FIELDS):
+        rows = Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).with_viewer_flags(AnonymousUser()).values(
+            'updated_at', *FastRecipeSerializer.get_values(fields)
+        )
+        rows = list(rows)
+        fragments = FastRecipeSerializer(
+            rows, context={'fields': fields}
+        ).data
+        return {
+            get_fragment_key(row['id'], row['updated_at']): fragment
+            for row, fragment in zip(rows, fragments)
+        }
+
+    def get_fragments(self):
+        cache = namespace('recipe_fragments')
+        keys = {
+            row['id']: get_fragment_key(row['id'], row['updated_at'])
+            for row in self.rows
+        }
+        fragments = cache.get_many(keys.values())
+        missing = [
+            recipe_id for recipe_id, key in keys.items()
+            if key not in fragments
+        ]
+        if missing and set(PUBLIC_FIELDS) <= set(self.public_fields):
+            built = self.build(missing)
+            cache.set_many(built)
+            fragments.update(built)
+        elif missing:
+            fragments.update(
+                self.build(missing, self.public_fields or ('id',))
+            )
+        return {
+            recipe_id: fragments[key]
+            for recipe_id, key in keys.items() if key in fragments
+        }
+
+    def get_flags(self, recipe_ids):
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return {}
+        if not {'author', *VIEWER_FIELDS}.intersection(self.fields):
+            return {}
+        rows = Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).with_viewer_flags(request.user).values_list(
+            'pk', 'is_favorited', 'is_in_shopping_cart', 'is_subscribed'
+        )
+        return {row[0]: row[1:] for row in rows}
+
+    def get_image(self, url):
+        request = self.context.get('request')
+        if url is None or request is None:
+            return url
+        return request.build_absolute_uri(url)
+
+    def overlay(self, fragment, flags):
+        favorited, in_shopping_cart, subscribed = flags
+        data = {
+            **fragment,
+            'is_favorited': favorited,
+            'is_in_shopping_cart': in_shopping_cart,
+        }
+        if 'author' in self.fields:
+            data['author'] = {**fragment['author'],
+                              'is_subscribed': subscribed}
+        if 'image' in self.fields:
+            data['image'] = self.get_image(fragment['image'])
+        return {field: data[field] for field in self.fields}
+
+    @property
+    def data(self):
+        if not self.rows:
+            return []
+        recipe_ids = [row['id'] for row in self.rows]
+        fragments = self.get_fragments()
+        flags = self.get_flags(recipe_ids)
+        return [
+            self.overlay(fragments[recipe_id],
+                         flags.get(recipe_id, (False, False, False)))
+            for recipe_id in recipe_ids if recipe_id in fragments
+        ]
@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, transaction
+from foodgram.cache import ChangeLog, changelog
+from recipe.models import AmountIngredient
+
+logger = logging.getLogger(__name__)
+
+INDEX_TTL = getattr(settings, 'INGREDIENT_INDEX_TTL', 300)
+INDEX_POLL = getattr(settings, 'INGREDIENT_INDEX_POLL', 1)
+LOG_MAX_APPLY = 1000
+LOG_GAP_WAIT = 5
+
+
+def publish_changes(recipe_ids=ChangeLog.ALL):
+    """
+    После фиксации транзакции применяет изменения рецептов к индексу
+    текущего процесса и публикует их в журнал для остальных.
+    """
+    if recipe_ids != ChangeLog.ALL:
+        recipe_ids = list(recipe_ids)
+
+    def apply():
+        if recipe_ids == ChangeLog.ALL:
+            ingredient_index.invalidate()
+        else:
+            ingredient_index.mark_dirty(*recipe_ids)
+
+    transaction.on_commit(apply)
+    changelog('ingredient_index').publish_on_commit(recipe_ids)
+
+
+class IngredientIndex:
+    """
+    Инвертированный индекс «ингредиент → рецепты» в памяти процесса;
+    скрытые рецепты в него не попадают.
+
+    Изменения других воркеров приходят через журнал ingredient_index
+    в общем кэше и применяются точечно: перечитываются только строки
+    измененных рецептов. Полная перестройка нужна при первом
+    обращении, раз в INDEX_TTL секунд, при разрыве журнала и по записи
+    ChangeLog.ALL; кроме первой, она идет в фоновом потоке, а запросы
+    до ее окончания обслуживает прежний индекс.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._postings = {}
+        self._sizes = {}
+        self._dirty = set()
+        self._built_at = None
+        self._sequence = 0
+        self._polled_at = 0
+        self._gap_since = None
+        self._rebuilding = False
+
+    @property
+    def changes(self):
+        return changelog('ingredient_index')
+
+    def mark_dirty(self, *recipe_ids):
+        with self._lock:
+            self._dirty.update(recipe_ids)
+
+    def invalidate(self):
+        with self._lock:
+            if self._built_at is not None:
+                self._built_at = 0
+
+    @staticmethod
+    def _load():
+        postings = {}
+        sizes = Counter()
+        rows = AmountIngredient.objects.filter(
+            recipe__is_hidden=False
+        ).values_list(
+            'ingredient_id', 'recipe_id'
+        ).order_by().iterator(chunk_size=10000)
+        for ingredient_id, recipe_id in rows:
+            postings.setdefault(ingredient_id, set()).add(recipe_id)
+            sizes[recipe_id] += 1
+        return postings, dict(sizes)
+
+    def _build(self):
+        sequence = self.changes.last()
+        postings, sizes = self._load()
+        with self._refresh_lock, self._lock:
+            # Изменения, закоммиченные во время загрузки, применятся
+            # повторно из журнала после номера sequence.
+            self._postings, self._sizes = postings, sizes
+            self._built_at = time.monotonic()
+            self._sequence = sequence
+            self._gap_since = None
+
+    def _rebuild_in_background(self):
+        try:
+            self._build()
+        except Exception:
+            logger.exception('Не удалось перестроить индекс ингредиентов.')
+        finally:
+            self._rebuilding = False
+            connections.close_all()
+
+    def _schedule_rebuild(self):
+        if self._rebuilding:
+            return
+        self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background,
+                         name='ingredient-index', daemon=True).start()
+
+    def _apply(self, dirty):
+        """
+        Строит копию индекса с перечитанными рецептами dirty; множества
+        рецептов опубликованного индекса не изменяются, копируются
+        только затронутые.
+        """
+        rows = list(AmountIngredient.objects.filter(
+            recipe_id__in=dirty, recipe__is_hidden=False
+        ).values_list('ingredient_id', 'recipe_id').order_by())
+        postings = dict(self._postings)
+        sizes = dict(self._sizes)
+        for recipe_id in dirty:
+            sizes.pop(recipe_id, None)
+        for ingredient_id, recipes in self._postings.items():
+            if not recipes.isdisjoint(dirty):
+                postings[ingredient_id] = recipes - dirty
+        copied = set()
+        for ingredient_id, recipe_id in rows:
+            if ingredient_id not in copied:
+                postings[ingredient_id] = set(postings.get(ingredient_id, ()))
+                copied.add(ingredient_id)
+            postings[ingredient_id].add(recipe_id)
+            sizes[recipe_id] = sizes.get(recipe_id, 0) + 1
+        return postings, sizes
+
+    def _read_changes(self):
+        """
+        Собирает id рецептов из новых записей журнала. Возвращает
+        ChangeLog.ALL, если журнал нельзя прочитать без пропусков.
+        """
+        now = time.monotonic()
+        if now - self._polled_at < INDEX_POLL:
+            return set()
+        self._polled_at = now
+        last = self.changes.last()
+        if last < self._sequence or last - self._sequence > LOG_MAX_APPLY:
+            return ChangeLog.ALL
+        entries = self.changes.read(self._sequence, last)
+        changed = set()
+        for sequence in range(self._sequence + 1, last + 1):
+            if sequence not in entries:
+                # Номер выдан, но запись еще не сохранена; если она не
+                # появилась за LOG_GAP_WAIT секунд, ее вытеснили из кэша.
+                if self._gap_since is None:
+                    self._gap_since = now
+                if now - self._gap_since > LOG_GAP_WAIT:
+                    return ChangeLog.ALL
+                break
+            if entries[sequence] == ChangeLog.ALL:
+                return ChangeLog.ALL
+            changed.update(entries[sequence])
+            self._sequence = sequence
+            self._gap_since = None
+        return changed
+
+    def refresh(self):
+        """
+        Применяет накопленные изменения. Запросы к базе идут без
+        блокировки индекса, под ней только подменяются ссылки; пока
+        один поток обновляет индекс, остальные работают с прежним.
+        """
+        if self._built_at is None:
+            with self._build_lock:
+                if self._built_at is None:
+                    self._build()
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                stale = time.monotonic() - self._built_at > INDEX_TTL
+            changed = self._read_changes()
+            if changed == ChangeLog.ALL or stale:
+                self._schedule_rebuild()
+                changed = set()
+            dirty |= changed
+            if dirty:
+                postings, sizes = self._apply(dirty)
+                with self._lock:
+                    self._postings, self._sizes = postings, sizes
+        finally:
+            self._refresh_lock.release()
+
+    def rank(self, ingredient_ids):
+        """
+        Возвращает список (recipe_id, coverage, missing), отсортированный
+        по убыванию доли имеющихся ингредиентов и числу недостающих.
+        """
+        self.refresh()
+        with self._lock:
+            postings, sizes = self._postings, self._sizes
+        owned = Counter()
+        for ingredient_id in set(ingredient_ids):
+            owned.update(postings.get(ingredient_id, ()))
+        ranking = [
+            (recipe_id, count / sizes[recipe_id], sizes[recipe_id] - count)
+            for recipe_id, count in owned.items()
+        ]
+        ranking.sort(key=lambda item: (-item[1], item[2], -item[0]))
+        return ranking
+
+
+ingredient_index = IngredientIndex()
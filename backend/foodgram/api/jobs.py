@@ -0,0 +1,11 @@
+from foodgram import cache
+from recipe.models import Recipe
+from tasks.dispatch import task
+
+
+@task
+def update_ingredient_recipes(ingredient_id):
+    Recipe.objects.filter(
+        amountingredient__ingredient_id=ingredient_id
+    ).update_totals()
+    cache.bump('recipe_pages')
@@ -0,0 +1,62 @@
+from api.benchmarks import make_request, measure, seed_recipes
+from api.fast_serializers import RECIPE_VALUES, FastRecipeSerializer
+from api.renderers import ORJSONRenderer
+from api.serializers import RecipeSerializer
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipe.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Сверяет вывод FastRecipeSerializer с RecipeSerializer '
+            'и сравнивает их скорость на страницах разного размера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[6, 50, 200])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--user', help='email зрителя')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='создать N рецептов и откатить их в конце')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.get(email=options['user'])
+        with transaction.atomic():
+            if options['seed']:
+                seed_recipes(options['seed'])
+            self.run(make_request(user), options)
+            transaction.set_rollback(True)
+
+    def run(self, request, options):
+        context = {'request': request}
+        renderer = ORJSONRenderer()
+        queryset = Recipe.objects.all()
+        self.stdout.write(f'{"size":>6}{"drf ms":>12}{"fast ms":>12}'
+                          f'{"speedup":>10}')
+        for size in options['sizes']:
+            def slow():
+                return RecipeSerializer(
+                    queryset.select_related('author').prefetch_related(
+                        'tags', 'amountingredient__ingredient')[:size],
+                    many=True, context=context
+                ).data
+
+            def fast():
+                return FastRecipeSerializer(
+                    queryset.with_viewer_flags(request.user).values(
+                        *RECIPE_VALUES)[:size],
+                    context=context
+                ).data
+
+            if renderer.render(slow()) != renderer.render(fast()):
+                raise CommandError(
+                    f'Вывод сериализаторов различается на {size} рецептах.'
+                )
+            slow_time = measure(slow, options['repeat'])[0]
+            fast_time = measure(fast, options['repeat'])[0]
+            self.stdout.write(f'{size:>6}{slow_time * 1000:>12.2f}'
+                              f'{fast_time * 1000:>12.2f}'
+                              f'{slow_time / fast_time:>9.1f}x')
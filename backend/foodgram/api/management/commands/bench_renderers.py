@@ -0,0 +1,41 @@
+from api.benchmarks import make_request, measure
+from api.renderers import ORJSONRenderer, orjson
+from api.serializers import IngredientSerializer, RecipeSerializer
+from django.core.management.base import BaseCommand
+from recipe.models import Ingredient, Recipe
+from rest_framework.renderers import JSONRenderer
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время и память кодирования ответов '
+            '/api/ingredients/ и /api/recipes/ разными рендерерами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson не установлен, ORJSONRenderer '
+                              'использует стандартный json.')
+        context = {'request': make_request()}
+        payloads = {
+            '/api/ingredients/': IngredientSerializer(
+                Ingredient.objects.all(), many=True, context=context
+            ).data,
+            '/api/recipes/': RecipeSerializer(
+                Recipe.objects.all()[:options['page_size']], many=True,
+                context=context
+            ).data,
+        }
+        renderers = {'json': JSONRenderer(), 'orjson': ORJSONRenderer()}
+        self.stdout.write(f'{"payload":<20}{"renderer":<10}{"bytes":>10}'
+                          f'{"ms":>10}{"peak KiB":>12}')
+        for path, data in payloads.items():
+            for name, renderer in renderers.items():
+                size = len(renderer.render(data))
+                best, peak = measure(lambda: renderer.render(data),
+                                     options['repeat'])
+                self.stdout.write(f'{path:<20}{name:<10}{size:>10}'
+                                  f'{best * 1000:>10.3f}'
+                                  f'{peak / 1024:>12.1f}')
@@ -0,0 +1,81 @@
+from api.benchmarks import measure, seed_recipes
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from foodgram.cache import namespace
+from recipe.models import Recipe
+from rest_framework.test import APIClient
+from users.models import User
+
+FIELD_SETS = {
+    'full': '',
+    'card': 'fields=id,name,image,cooking_time,tags,is_favorited,'
+            'is_in_shopping_cart',
+    'no-text': 'omit=text,ingredients',
+    'ids': 'fields=id,name',
+}
+# Без сброса кэшей анонимные страницы и фрагменты рецептов после
+# первого запроса отдаются из кэша, и замер не отражает выбор полей.
+# Сбрасывается отдельный локальный кэш, общий кэш не затрагивается.
+CACHE_NAMESPACES = ('recipe_pages', 'recipe_fragments')
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает размер ответа, число запросов и время '
+            '/api/recipes/ и /api/recipes/<id>/ для разных наборов полей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--user', help='email зрителя')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='создать N рецептов и откатить их в конце')
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        if options['user']:
+            client.force_authenticate(
+                User.objects.get(email=options['user'])
+            )
+        with override_settings(CACHES=LOCAL_CACHES), transaction.atomic():
+            if options['seed']:
+                seed_recipes(options['seed'])
+            recipe_id = Recipe.objects.values_list('pk', flat=True).first()
+            if recipe_id is None:
+                raise CommandError('Нет рецептов для замера.')
+            urls = {
+                'list': '/api/recipes/?',
+                'retrieve': f'/api/recipes/{recipe_id}/?',
+            }
+            self.stdout.write(f'{"endpoint":<10}{"fields":<10}'
+                              f'{"bytes":>10}{"queries":>9}{"ms":>10}')
+            for endpoint, url in urls.items():
+                for name, query in FIELD_SETS.items():
+                    self.run(client, endpoint, name,
+                             f'{url}&{query}' if query else url, options)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def get_uncached(client, url):
+        for name in CACHE_NAMESPACES:
+            namespace(name).bump()
+        return client.get(url)
+
+    def run(self, client, endpoint, name, url, options):
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            response = self.get_uncached(client, url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: ответ {response.status_code}.')
+        best = measure(lambda: self.get_uncached(client, url),
+                       options['repeat'])[0]
+        self.stdout.write(f'{endpoint:<10}{name:<10}'
+                          f'{len(response.content):>10}{len(queries):>9}'
+                          f'{best * 1000:>10.2f}')
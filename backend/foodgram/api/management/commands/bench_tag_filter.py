@@ -0,0 +1,66 @@
+from api.benchmarks import measure, seed_recipes
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, Q
+from recipe.models import Recipe, Tag
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает фильтр рецептов по тегам через JOIN '
+            'с фильтром по битовой маске tags_mask.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', nargs='+', default=None,
+                            help='слаги тегов (по умолчанию два первых)')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--seed', type=int, default=0,
+                            help='создать N рецептов и откатить их в конце '
+                                 '(например, 1000000)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                seed_recipes(options['seed'], ingredients_per_recipe=0)
+            tags = Tag.objects.exclude(bit=None)
+            if options['tags']:
+                tags = tags.filter(slug__in=options['tags'])
+            tags = list(tags[:len(options['tags'] or ()) or 2])
+            if not tags:
+                raise CommandError('Теги не найдены.')
+            self.run(tags, options)
+            transaction.set_rollback(True)
+
+    def run(self, tags, options):
+        slugs = [tag.slug for tag in tags]
+        mask = Tag.get_mask(tags)
+        masked = Recipe.objects.alias(tag_bits=F('tags_mask').bitand(mask))
+        queries = {
+            'any': (
+                Recipe.objects.filter(tags__slug__in=slugs).distinct(),
+                masked.exclude(tag_bits=0),
+            ),
+            'all': (
+                Recipe.objects.annotate(matched=Count(
+                    'tags', filter=Q(tags__slug__in=slugs)
+                )).filter(matched=len(slugs)),
+                masked.filter(tag_bits=mask),
+            ),
+        }
+        self.stdout.write(f'Теги: {", ".join(slugs)}')
+        self.stdout.write(f'{"mode":<6}{"query":<8}{"rows":>10}'
+                          f'{"count ms":>12}{"page ms":>12}')
+        for mode, (join, bitmask) in queries.items():
+            join_ids = set(join.values_list('pk', flat=True))
+            mask_ids = set(bitmask.values_list('pk', flat=True))
+            if join_ids != mask_ids:
+                raise CommandError(f'Фильтры {mode} вернули разные рецепты.')
+            for name, queryset in (('join', join), ('bitmask', bitmask)):
+                count_time = measure(queryset.count, options['repeat'])[0]
+                page_time = measure(
+                    lambda: list(queryset[:options['page_size']]),
+                    options['repeat']
+                )[0]
+                self.stdout.write(f'{mode:<6}{name:<8}{len(join_ids):>10}'
+                                  f'{count_time * 1000:>12.2f}'
+                                  f'{page_time * 1000:>12.2f}')
@@ -0,0 +1,140 @@
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+SCENARIO = (
+    ('feed', 50),
+    ('filter', 25),
+    ('favorite', 15),
+    ('download', 10),
+)
+
+
+class ThrottledError(Exception):
+    """
+    Сервер ответил 429: операция упирается в троттлинг, а не
+    в производительность.
+    """
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный сценарий API: лента, фильтры, избранное и '
+            'скачивание списка покупок. Печатает RPS и p95 по операциям.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000')
+        parser.add_argument('--token', help='токен для операций с '
+                            'избранным и списком покупок')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument('--label', default='',
+                            help='метка конфигурации для отчета')
+        parser.add_argument('--output',
+                            help='дописать результат в JSONL-файл')
+
+    def handle(self, *args, **options):
+        self.base_url = options['base_url'].rstrip('/')
+        self.headers = {}
+        if options['token']:
+            self.headers['Authorization'] = f'Token {options["token"]}'
+        response = requests.get(f'{self.base_url}/api/recipes/')
+        if response.status_code != 200:
+            raise CommandError(f'Лента недоступна: {response.status_code}')
+        feed = response.json()
+        self.recipe_ids = [recipe['id'] for recipe in feed['results']]
+        self.pages = max(1, -(-feed['count'] // max(1, len(self.recipe_ids))))
+        self.tags = [t['slug'] for t in
+                     requests.get(f'{self.base_url}/api/tags/').json()]
+        operations = [name for name, _ in SCENARIO
+                      if options['token'] or name in ('feed', 'filter')]
+        weights = [weight for name, weight in SCENARIO if name in operations]
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.throttled = defaultdict(int)
+        deadline = time.monotonic() + options['duration']
+        threads = [
+            threading.Thread(target=self.worker,
+                             args=(deadline, operations, weights))
+            for _ in range(options['concurrency'])
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.report(time.monotonic() - started, options)
+
+    def worker(self, deadline, operations, weights):
+        session = requests.Session()
+        session.headers.update(self.headers)
+        while time.monotonic() < deadline:
+            name = random.choices(operations, weights)[0]
+            started = time.monotonic()
+            try:
+                ok = getattr(self, f'do_{name}')(session)
+            except ThrottledError:
+                self.throttled[name] += 1
+                continue
+            except requests.RequestException:
+                ok = False
+            self.timings[name].append(time.monotonic() - started)
+            if not ok:
+                self.errors[name] += 1
+
+    @staticmethod
+    def not_throttled(response):
+        if response.status_code == 429:
+            raise ThrottledError
+        return response
+
+    def do_feed(self, session):
+        page = random.randint(1, self.pages)
+        return self.not_throttled(session.get(
+            f'{self.base_url}/api/recipes/?page={page}')).ok
+
+    def do_filter(self, session):
+        tags = random.sample(self.tags, random.randint(1, len(self.tags)))
+        query = '&'.join(f'tags={slug}' for slug in tags)
+        return self.not_throttled(
+            session.get(f'{self.base_url}/api/recipes/?{query}')).ok
+
+    def do_favorite(self, session):
+        url = (f'{self.base_url}/api/recipes/'
+               f'{random.choice(self.recipe_ids)}/favorite/')
+        self.not_throttled(session.post(url))
+        return self.not_throttled(session.delete(url)).status_code == 204
+
+    def do_download(self, session):
+        return self.not_throttled(session.get(
+            f'{self.base_url}/api/recipes/download_shopping_cart/')).ok
+
+    def report(self, elapsed, options):
+        result = {'label': options['label'],
+                  'concurrency': options['concurrency'], 'operations': {}}
+        total = sum(len(values) for values in self.timings.values())
+        result['rps'] = round(total / elapsed, 1)
+        self.stdout.write(f'{options["label"] or "-"}: {result["rps"]} RPS')
+        self.stdout.write(f'{"operation":<10}{"count":>8}{"errors":>8}'
+                          f'{"429":>8}{"p50 ms":>10}{"p95 ms":>10}')
+        for name in sorted(set(self.timings) | set(self.throttled)):
+            values = self.timings[name]
+            p50 = statistics.median(values) * 1000 if values else 0
+            p95 = (statistics.quantiles(values, n=20)[-1] * 1000
+                   if len(values) > 1 else p50)
+            result['operations'][name] = {
+                'count': len(values), 'errors': self.errors[name],
+                'throttled': self.throttled[name],
+                'p50_ms': round(p50, 1), 'p95_ms': round(p95, 1)}
+            self.stdout.write(f'{name:<10}{len(values):>8}'
+                              f'{self.errors[name]:>8}'
+                              f'{self.throttled[name]:>8}{p50:>10.1f}'
+                              f'{p95:>10.1f}')
+        if options['output']:
+            with open(options['output'], 'a', encoding='utf-8') as file:
+                file.write(json.dumps(result, ensure_ascii=False) + '\n')
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+BOOT_CODE = 'import foodgram.wsgi'
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время импорта модулей при старте воркера '
+            '(python -X importtime).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=30)
+        parser.add_argument('--sort', choices=('cumulative', 'self'),
+                            default='cumulative')
+        parser.add_argument('--no-warmup', action='store_true',
+                            help='не выполнять прогрев после импорта')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        if options['no_warmup']:
+            env['DJANGO_WARMUP'] = '0'
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_CODE],
+            capture_output=True, text=True, env=env
+        )
+        if result.returncode:
+            raise CommandError(result.stderr[-2000:])
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or '[us]' in line:
+                continue
+            self_us, cumulative_us, module = line[12:].split('|')
+            rows.append((int(self_us), int(cumulative_us), module.rstrip()))
+        key = 1 if options['sort'] == 'cumulative' else 0
+        rows.sort(key=lambda row: row[key], reverse=True)
+        total = sum(row[0] for row in rows)
+        self.stdout.write(f'Модулей: {len(rows)}, всего {total / 1000:.0f} '
+                          f'мс')
+        self.stdout.write(f'{"self ms":>10}{"cumul ms":>10}  module')
+        for self_us, cumulative_us, module in rows[:options['top']]:
+            self.stdout.write(f'{self_us / 1000:>10.1f}'
+                              f'{cumulative_us / 1000:>10.1f}  {module}')
@@ -0,0 +1,248 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from foodgram.cache import namespace, stats
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    Миксин условных GET-запросов для list и retrieve.
+
+    ETag строится одним запросом по полям validator_fields, и при
+    совпадении с версией клиента ответ 304 возвращается до сериализации.
+    Last-Modified не отдается: ответ зависит от состояния пользователя
+    (избранное, корзина, подписки), и время изменения рецептов его не
+    описывает.
+    """
+    validator_fields = ('pk', 'updated_at')
+
+    def get_validator_queryset(self, queryset, filtered):
+        """
+        queryset — строки ответа (страница списка), filtered — весь
+        отфильтрованный список до нарезки на страницы.
+        """
+        return queryset
+
+    def get_list_queryset(self, queryset):
+        return queryset
+
+    def get_list_data(self, page):
+        return self.get_serializer(page, many=True).data
+
+    def get_detail_data(self, instance):
+        return self.get_serializer(instance).data
+
+    def get_page_bounds(self):
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        page_size = paginator.get_page_size(self.request)
+        page = self.request.query_params.get(paginator.page_query_param, '1')
+        if not page_size or not page.isdigit() or int(page) < 1:
+            return None
+        offset = (int(page) - 1) * page_size
+        return offset, offset + page_size
+
+    def get_etag(self, queryset, filtered):
+        rows = list(
+            self.get_validator_queryset(queryset, filtered).values_list(
+                *self.validator_fields
+            )
+        )
+        if not rows:
+            return None
+        digest = hashlib.md5(
+            f'{self.request.get_full_path()}:{rows}'.encode()
+        ).hexdigest()
+        return quote_etag(digest)
+
+    def get_conditional_response(self, queryset, filtered=None):
+        etag = self.get_etag(
+            queryset, queryset if filtered is None else filtered
+        )
+        if etag is None:
+            return None, None
+        return get_conditional_response(self.request, etag=etag), etag
+
+    @staticmethod
+    def set_validators(response, etag):
+        if etag is not None and response.status_code == 200:
+            response['ETag'] = etag
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        bounds = self.get_page_bounds()
+        not_modified = validators = None
+        if bounds is not None:
+            not_modified, validators = self.get_conditional_response(
+                queryset[bounds[0]:bounds[1]], queryset
+            )
+        if not_modified is not None:
+            return not_modified
+        queryset = self.get_list_queryset(queryset)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(self.get_list_data(page))
+        else:
+            response = Response(self.get_list_data(queryset))
+        return self.set_validators(response, validators)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.get_queryset().filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError):
+            return super().retrieve(request, *args, **kwargs)
+        not_modified, validators = self.get_conditional_response(queryset)
+        if not_modified is not None:
+            return not_modified
+        response = Response(self.get_detail_data(self.get_object()))
+        return self.set_validators(response, validators)
+
+
+class AnonymousPageCacheMixin:
+    """
+    Кэш страниц списка для анонимных GET-запросов.
+
+    Ключ строится по схеме, хосту и нормализованным параметрам
+    запроса: учитываются только параметры фильтров, пагинации и выбора
+    полей, значения списков сортируются, а первая страница совпадает
+    с запросом без page. Записи живут в пространстве
+    page_cache_namespace, версия которого растет при изменении рецептов.
+    """
+    page_cache_namespace = None
+    page_cache_metric = None
+    page_cache_sorted_params = ()
+    page_cache_list_params = ('fields', 'omit')
+
+    def get_page_cache_params(self):
+        params = set(self.page_cache_sorted_params)
+        params.update(self.page_cache_list_params)
+        if self.filterset_class is not None:
+            params.update(self.filterset_class.base_filters)
+        if self.paginator is not None:
+            params.add(self.paginator.page_query_param)
+            params.add(getattr(self.paginator, 'page_size_query_param', None))
+        return params
+
+    def get_page_cache_key(self):
+        query_params = self.request.query_params
+        # Ссылки в ответе абсолютные, поэтому схема и хост входят в ключ.
+        normalized = [('scheme', self.request.scheme),
+                      ('host', self.request.get_host())]
+        for param in sorted(self.get_page_cache_params().intersection(
+                query_params)):
+            values = [value for value in query_params.getlist(param)
+                      if value]
+            if param in self.page_cache_list_params:
+                values = sorted({
+                    item for value in values
+                    for item in value.split(',') if item
+                })
+                values = [','.join(values)] if values else []
+            elif param in self.page_cache_sorted_params:
+                values = sorted(set(values))
+            if (self.paginator is not None and values == ['1']
+                    and param == self.paginator.page_query_param):
+                continue
+            normalized.extend((param, value) for value in values)
+        return hashlib.md5(urlencode(normalized).encode()).hexdigest()
+
+    def record_page_cache(self, event, started):
+        elapsed = int((time.monotonic() - started) * 1000)
+        stats.record(f'{self.page_cache_metric}.{event}')
+        stats.record(f'{self.page_cache_metric}.{event}_ms', elapsed)
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated or self.page_cache_namespace is None:
+            return super().list(request, *args, **kwargs)
+        started = time.monotonic()
+        cache = namespace(self.page_cache_namespace)
+        key = self.get_page_cache_key()
+        cached = cache.get(key)
+        if cached is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, (response.data, response.get('ETag')))
+            self.record_page_cache('miss', started)
+            return response
+        data, etag = cached[:2]
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(data)
+            if etag is not None:
+                response['ETag'] = etag
+                patch_vary_headers(response, ('Authorization',))
+        self.record_page_cache('hit', started)
+        return response
+
+
+class SparseFieldsMixin:
+    """
+    Миксин параметров ?fields= и ?omit= для безопасных запросов.
+
+    Выбранные поля передаются сериализатору через контекст, а вьюсет
+    по wants() решает, какие запросы и колонки ему нужны.
+    """
+    fields_param = 'fields'
+    omit_param = 'omit'
+
+    def get_query_fields(self, param):
+        value = self.request.query_params.get(param, '')
+        return [field for field in value.split(',') if field]
+
+    def get_sparse_fields(self):
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+        self._sparse_fields = None
+        if self.request.method not in SAFE_METHODS:
+            return None
+        fields = self.get_query_fields(self.fields_param)
+        omit = self.get_query_fields(self.omit_param)
+        if not fields and not omit:
+            return None
+        available = self.get_serializer_class().Meta.fields
+        unknown = set(fields).union(omit).difference(available)
+        if unknown:
+            raise ValidationError({
+                self.fields_param: f'Неизвестные поля: '
+                                   f'{", ".join(sorted(unknown))}.'
+            })
+        self._sparse_fields = tuple(
+            field for field in available
+            if (not fields or field in fields) and field not in omit
+        )
+        return self._sparse_fields
+
+    def wants(self, field):
+        fields = self.get_sparse_fields()
+        return fields is None or field in fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields()
+        return context
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Убирает из корневого сериализатора поля, не вошедшие
+    в context['fields'].
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self._context.get('fields')
+        if fields is not None:
+            for name in set(self.fields).difference(fields):
+                self.fields.pop(name)
@@ -1,11 +1,15 @@
 from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
+from recipe.images import delete_unreferenced
 from recipe.models import (AmountIngredient, Favorite, Ingredient, Recipe,
                            ShoppingCart, Tag)
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 from users.serializers import CustomUserSerializer
 
+from .mixins import SparseFieldsSerializerMixin
+from .signals import mark_recipe_dirty
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     """
@@ -42,7 +46,7 @@ class TagSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Tag
-        fields = '__all__'
+        fields = ('id', 'name', 'color', 'slug')
         read_only_fields = ['__all__']
 
 
@@ -67,7 +71,8 @@ class AddIngredientRecipeSerializer(serializers.ModelSerializer):
         fields = ('recipe', 'id', 'amount')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsSerializerMixin,
+                       serializers.ModelSerializer):
     """
     Сериализатор представления рецепта.
     """
@@ -91,15 +96,29 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField(
         read_only=True
     )
+    calories = serializers.DecimalField(
+        source='total_calories',
+        max_digits=12,
+        decimal_places=2,
+        read_only=True
+    )
+    cost = serializers.DecimalField(
+        source='total_cost',
+        max_digits=12,
+        decimal_places=2,
+        read_only=True
+    )
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
                   'is_in_shopping_cart', 'name', 'image', 'text',
-                  'cooking_time')
+                  'cooking_time', 'calories', 'cost')
         read_only_fields = ['author']
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         favorit_user = self.context.get('request').user
         if favorit_user.is_authenticated:
             return Favorite.objects.filter(
@@ -108,6 +127,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         shop_cart_user = self.context.get('request').user
         if shop_cart_user.is_authenticated:
             return ShoppingCart.objects.filter(
@@ -117,6 +138,21 @@ class RecipeSerializer(serializers.ModelSerializer):
         return False
 
 
+class CookableRecipeSerializer(RecipeSerializer):
+    """
+    Сериализатор рецепта в подборке по имеющимся ингредиентам.
+    """
+    coverage = serializers.FloatField(
+        read_only=True
+    )
+    missing = serializers.IntegerField(
+        read_only=True
+    )
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('coverage', 'missing')
+
+
 class AddRecipeSerializer(serializers.ModelSerializer):
     """
     Сериализатор добавления рецепта.
@@ -144,12 +180,19 @@ class AddRecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Добавьте ингредиент.')
         return value
 
-    @transaction.atomic
-    def create(self, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
+    @staticmethod
+    def calculate_totals(ingredients):
+        totals = {'total_calories': 0, 'total_cost': 0}
+        for item in ingredients:
+            ingredient, amount = item['ingredient'], item['amount']
+            if ingredient.calories is not None:
+                totals['total_calories'] += ingredient.calories * amount
+            if ingredient.price is not None:
+                totals['total_cost'] += ingredient.price * amount
+        return totals
+
+    @staticmethod
+    def create_ingredients(recipe, ingredients):
         create_ingredient = [
             AmountIngredient(
                 recipe=recipe,
@@ -159,6 +202,16 @@ class AddRecipeSerializer(serializers.ModelSerializer):
             for ingredient in ingredients
         ]
         AmountIngredient.objects.bulk_create(create_ingredient)
+        mark_recipe_dirty(recipe.id)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        ingredients = validated_data.pop('ingredients')
+        tags = validated_data.pop('tags')
+        validated_data.update(self.calculate_totals(ingredients))
+        recipe = Recipe.objects.create(**validated_data)
+        recipe.tags.set(tags)
+        self.create_ingredients(recipe, ingredients)
         return recipe
 
     def to_representation(self, instance):
@@ -166,23 +219,24 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         context = {'request': request}
         return RecipeSerializer(instance, context=context).data
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        old_image = instance.image.name
         ingredients = validated_data.pop('ingredients', None)
         tags = validated_data.pop('tags', None)
         if tags is not None:
             instance.tags.set(tags)
         if ingredients is not None:
             instance.ingredients.clear()
-            create_ingredient = [
-                AmountIngredient(
-                    recipe=instance,
-                    ingredient=ingredient['ingredient'],
-                    amount=ingredient['amount']
-                )
-                for ingredient in ingredients
-            ]
-            AmountIngredient.objects.bulk_create(create_ingredient)
-        return super().update(instance, validated_data)
+            self.create_ingredients(instance, ingredients)
+            validated_data.update(self.calculate_totals(ingredients))
+        instance = super().update(instance, validated_data)
+        if instance.image.name != old_image:
+            storage = instance.image.storage
+            transaction.on_commit(
+                lambda: delete_unreferenced(storage, old_image)
+            )
+        return instance
 
 
 class FavoriteRecipeSerializer(serializers.ModelSerializer):
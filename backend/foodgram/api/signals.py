@@ -0,0 +1,120 @@
+from django.db.models import F
+from django.db.models.functions import Now
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from foodgram import cache
+from recipe import counters
+from recipe.models import AmountIngredient, Ingredient, Recipe, Tag
+from users.models import User
+
+from .ingredient_index import publish_changes
+from .jobs import update_ingredient_recipes
+
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+
+def mark_recipe_dirty(recipe_id):
+    publish_changes([recipe_id])
+
+
+def recipes_with_tag(tag):
+    return Recipe.objects.alias(
+        tag_bit=F('tags_mask').bitand(tag.mask)
+    ).exclude(tag_bit=0)
+
+
+@receiver([post_save, post_delete], sender=AmountIngredient)
+def amount_ingredient_changed(sender, instance, **kwargs):
+    mark_recipe_dirty(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        mark_recipe_dirty(instance.pk)
+    elif pk_set:
+        for recipe_id in pk_set:
+            mark_recipe_dirty(recipe_id)
+    else:
+        publish_changes()
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        update_ingredient_recipes.delay(instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        instance.tags_mask = Tag.get_mask(
+            Tag.objects.filter(recipes=instance).exclude(bit=None)
+        )
+        Recipe.objects.filter(pk=instance.pk).update(
+            tags_mask=instance.tags_mask
+        )
+    elif pk_set:
+        Recipe.objects.filter(pk__in=pk_set).update_tags_mask()
+    else:
+        recipes_with_tag(instance).update_tags_mask()
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    recipes_with_tag(instance).update_tags_mask()
+
+
+@receiver(post_save, sender=Tag)
+def tag_changed(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(tags=instance).update(updated_at=Now())
+
+
+@receiver(pre_save, sender=User)
+def author_saving(sender, instance, update_fields=None, **kwargs):
+    instance._author_changed = False
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(AUTHOR_FIELDS).intersection(
+            update_fields):
+        return
+    saved = User.objects.filter(pk=instance.pk).values(*AUTHOR_FIELDS).first()
+    instance._author_changed = saved is not None and any(
+        saved[field] != getattr(instance, field) for field in AUTHOR_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, created, **kwargs):
+    """
+    Автор входит в ответы рецептов, поэтому кэш страниц и фрагментов
+    сбрасывается, только если у пользователя есть видимые рецепты
+    и изменились выводимые поля.
+    """
+    if created or not getattr(instance, '_author_changed', False):
+        return
+    if Recipe.objects.filter(author=instance, is_hidden=False).exists():
+        cache.bump('recipe_pages', 'recipe_fragments')
+
+
+def counted_saved(sender, instance, created, **kwargs):
+    if created:
+        kind, field = counters.SOURCES[sender]
+        counters.increment(kind, getattr(instance, field))
+
+
+def counted_deleted(sender, instance, **kwargs):
+    kind, field = counters.SOURCES[sender]
+    counters.increment(kind, getattr(instance, field), -1)
+
+
+for model in counters.SOURCES:
+    post_save.connect(counted_saved, sender=model)
+    post_delete.connect(counted_deleted, sender=model)
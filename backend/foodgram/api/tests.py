@@ -0,0 +1,339 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from api.benchmarks import make_request, seed_recipes
+from api.fast_serializers import (FIELD_VALUES, RECIPE_VALUES,
+                                  FastRecipeSerializer)
+from api.fragments import get_fragment_key
+from api.ingredient_index import IngredientIndex
+from api.serializers import RecipeSerializer
+from api.views import RecipeViewSet
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from foodgram.cache import namespace
+from foodgram.tests import LOCMEM_CACHES
+from PIL import Image
+from recipe.models import Favorite, Recipe, ShoppingCart, Tag
+from recipe.purge import hide
+from rest_framework.test import APIClient
+from users.models import Follow, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FastRecipeSerializerTest(TestCase):
+    """
+    Вывод FastRecipeSerializer совпадает с RecipeSerializer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = seed_recipes(5, ingredients_per_recipe=3)
+        cls.viewer = User.objects.create(
+            email='viewer@foodgram.local', username='viewer',
+            first_name='viewer', last_name='viewer'
+        )
+        recipes = list(Recipe.objects.order_by('id'))
+        recipes[0].image.save('dish.png', ContentFile(b'png'))
+        Favorite.objects.create(user=cls.viewer, recipe=recipes[0])
+        ShoppingCart.objects.create(user=cls.viewer, recipe=recipes[1])
+        Follow.objects.create(user=cls.viewer, author=cls.author)
+        Recipe.objects.all().update_totals()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def serialize(self, user, fields=None):
+        request = make_request(user)
+        context = {'request': request}
+        if fields is not None:
+            context['fields'] = fields
+        queryset = Recipe.objects.order_by('id')
+        slow = RecipeSerializer(
+            queryset.select_related('author').prefetch_related(
+                'tags', 'amountingredient__ingredient'),
+            many=True, context=context
+        ).data
+        fast = FastRecipeSerializer(
+            queryset.with_viewer_flags(request.user).values(*RECIPE_VALUES),
+            context=context
+        ).data
+        return [dict(item) for item in slow], fast
+
+    def test_anonymous(self):
+        slow, fast = self.serialize(None)
+        self.assertEqual(fast, slow)
+
+    def test_viewer_flags(self):
+        slow, fast = self.serialize(self.viewer)
+        self.assertEqual(fast, slow)
+        self.assertTrue(fast[0]['is_favorited'])
+        self.assertTrue(fast[1]['is_in_shopping_cart'])
+        self.assertTrue(fast[0]['author']['is_subscribed'])
+        self.assertTrue(fast[0]['image'].startswith('http://localhost/'))
+
+    def test_selected_fields(self):
+        for fields in (('id', 'name'), ('author', 'tags', 'cost'),
+                       tuple(FIELD_VALUES)):
+            with self.subTest(fields=fields):
+                slow, fast = self.serialize(self.viewer, fields)
+                self.assertEqual(fast, slow)
+                self.assertEqual(tuple(fast[0]), fields)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REPLICA_VIEWS=[],
+                   PROFILER_SAMPLE_RATE=0)
+class AuthorInvalidationTest(TestCase):
+    """
+    Сохранение пользователя сбрасывает кэш ленты, только если меняются
+    поля автора видимых рецептов.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = seed_recipes(1, ingredients_per_recipe=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_versions(self):
+        return [namespace(name).get_version()
+                for name in ('recipe_pages', 'recipe_fragments')]
+
+    def save(self, user, **kwargs):
+        before = self.get_versions()
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save(**kwargs)
+        return before != self.get_versions()
+
+    def test_author_name_change(self):
+        self.author.first_name = 'renamed'
+        self.assertTrue(self.save(self.author))
+
+    def test_login_and_unrelated_fields(self):
+        self.author.last_login = timezone.now()
+        self.assertFalse(self.save(self.author,
+                                   update_fields=['last_login']))
+        self.author.is_staff = True
+        self.assertFalse(self.save(self.author))
+
+    def test_user_without_visible_recipes(self):
+        Recipe.objects.filter(author=self.author).update(is_hidden=True)
+        self.author.first_name = 'renamed'
+        self.assertFalse(self.save(self.author))
+        user = User(email='new@foodgram.local', username='new',
+                    first_name='new', last_name='new')
+        self.assertFalse(self.save(user))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REPLICA_VIEWS=[],
+                   PROFILER_SAMPLE_RATE=0, MEDIA_ROOT=MEDIA_ROOT)
+class HiddenRecipesTest(TestCase):
+    """
+    Скрытые рецепты не попадают в индекс ингредиентов и не отдают
+    картинок.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_recipes(2, ingredients_per_recipe=2)
+        cls.recipe = Recipe.objects.order_by('id').first()
+        cls.ingredient_ids = list(
+            cls.recipe.amountingredient.values_list('ingredient_id',
+                                                    flat=True)
+        )
+        image = io.BytesIO()
+        Image.new('RGB', (20, 20), 'red').save(image, 'PNG')
+        cls.recipe.image.save('dish.png', ContentFile(image.getvalue()))
+
+    def setUp(self):
+        cache.clear()
+
+    def hide(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            hide(Recipe, [self.recipe.pk], enqueue=False)
+
+    def ranked(self, index):
+        return [recipe_id for recipe_id, _, _ in
+                index.rank(self.ingredient_ids)]
+
+    def test_index(self):
+        index = IngredientIndex()
+        self.assertIn(self.recipe.pk, self.ranked(index))
+        self.hide()
+        index._polled_at = 0
+        self.assertNotIn(self.recipe.pk, self.ranked(index))
+        self.assertNotIn(self.recipe.pk, self.ranked(IngredientIndex()))
+
+    def test_image(self):
+        url = (f'/api/recipes/{self.recipe.pk}/image/'
+               f'{settings.RECIPE_IMAGE_SIZES[0]}/')
+        self.assertEqual(APIClient().get(url).status_code, 302)
+        self.hide()
+        self.assertEqual(APIClient().get(url).status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REPLICA_VIEWS=[],
+                   PROFILER_SAMPLE_RATE=0)
+class TagFilterTest(TestCase):
+    """
+    Фильтр ?tags= работает и для тегов без бита в маске.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_recipes(3, ingredients_per_recipe=1)
+        cls.tag = Tag.objects.bulk_create([
+            Tag(name='Без бита', color='#000000', slug='no-bit')
+        ])[0]
+        cls.recipe = Recipe.objects.order_by('id').first()
+        cls.recipe.tags.add(cls.tag)
+
+    def test_tag_without_bit(self):
+        tag = Tag.objects.get(slug='no-bit')
+        self.assertIsNone(tag.bit)
+        self.assertEqual(Tag.get_mask([tag]), 0)
+        for mode in ('any', 'all'):
+            with self.subTest(mode=mode):
+                response = APIClient().get(
+                    '/api/recipes/', {'tags': 'no-bit', 'tags_mode': mode}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    [recipe['id'] for recipe in response.json()['results']],
+                    [self.recipe.pk]
+                )
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REPLICA_VIEWS=[],
+                   PROFILER_SAMPLE_RATE=0)
+class ThrottleTest(TestCase):
+    """
+    Лимиты SlidingWindowThrottle (download_shopping_cart: 10/min).
+    """
+    url = '/api/recipes/download_shopping_cart/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create(email=f'buyer{number}@foodgram.local',
+                                username=f'buyer{number}',
+                                first_name='buyer', last_name='buyer')
+            for number in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def get_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_limit(self):
+        client = self.get_client(self.users[0])
+        statuses = [client.get(self.url).status_code for _ in range(10)]
+        self.assertEqual(statuses, [200] * 10)
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_limit_per_user(self):
+        client = self.get_client(self.users[0])
+        for _ in range(11):
+            client.get(self.url)
+        response = self.get_client(self.users[1]).get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REPLICA_VIEWS=[],
+                   PROFILER_SAMPLE_RATE=0)
+class RecipeRetrieveTest(TestCase):
+    """
+    Страница рецепта, собранная из фрагментов.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_recipes(1, ingredients_per_recipe=2)
+        cls.recipe = Recipe.objects.get()
+        cls.url = f'/api/recipes/{cls.recipe.pk}/'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_recipe_vanishes_during_request(self):
+        get_object = RecipeViewSet.get_object
+
+        def vanish(view):
+            instance = get_object(view)
+            Recipe.objects.filter(pk=instance.pk).delete()
+            return instance
+
+        with mock.patch.object(RecipeViewSet, 'get_object', vanish):
+            response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_selected_fields_on_miss(self):
+        response = APIClient().get(self.url, {'fields': 'id,name'})
+        self.assertEqual(response.json(),
+                         {'id': self.recipe.pk, 'name': self.recipe.name})
+        self.assertEqual(
+            namespace('recipe_fragments').get_many(
+                [get_fragment_key(self.recipe.pk, self.recipe.updated_at)]
+            ), {}
+        )
+        response = APIClient().get(self.url)
+        self.assertEqual(len(response.json()['ingredients']), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REPLICA_VIEWS=[],
+                   PROFILER_SAMPLE_RATE=0)
+class AnonymousPageCacheTest(TestCase):
+    """
+    Ключ кэша анонимной ленты: хост и значимые параметры запроса.
+    """
+    url = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_recipes(7, ingredients_per_recipe=1)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.get(self.url)
+        # Правка без сигналов: кэш ленты о ней не знает.
+        Recipe.objects.update(name='Новое название',
+                              updated_at=timezone.now())
+
+    def get_names(self, **kwargs):
+        response = self.client.get(self.url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return {recipe['name'] for recipe in response.json()['results']}
+
+    def test_normalized_params_hit(self):
+        for params in ({}, {'page': 1}, {'utm_source': 'mail'}):
+            with self.subTest(params=params):
+                self.assertNotIn('Новое название',
+                                 self.get_names(data=params))
+
+    def test_host_and_filters_miss(self):
+        self.assertEqual(self.get_names(HTTP_HOST='evil.example'),
+                         {'Новое название'})
+        self.assertEqual(self.get_names(data={'ordering': 'cost'}),
+                         {'Новое название'})
+
+    def test_links_use_request_host(self):
+        response = self.client.get(self.url, HTTP_HOST='mirror.example')
+        self.assertTrue(
+            response.json()['next'].startswith('http://mirror.example/')
+        )
@@ -0,0 +1,67 @@
+import time
+
+from django.core.cache import cache
+from foodgram import metrics
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Троттлинг скользящим окном на счетчиках в кэше. Группа лимита
+    задается атрибутом throttle_scope вьюсета или действия, лимит вида
+    '30/min' берется из DEFAULT_THROTTLE_RATES. Отказы считаются
+    в метриках.
+
+    Запросы считаются атомарными add/incr по окнам длиной в период,
+    а число запросов за последний период оценивается как счетчик
+    текущего окна плюс доля предыдущего. Параллельные запросы одного
+    клиента не теряют обновлений, если бэкенд кэша выполняет incr
+    атомарно (Redis, Memcached).
+    """
+    cache = cache
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            return True
+        count, period = rate.split('/')
+        self.capacity = int(count)
+        self.period = PERIODS[period[0]]
+        if request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        now = time.time()
+        window, elapsed = divmod(now, self.period)
+        key = f'throttle:{self.scope}:{ident}:{int(window)}'
+        self.cache.add(key, 0, self.period * 2)
+        try:
+            current = self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 1, self.period * 2)
+            current = 1
+        self.previous = self.cache.get(
+            f'throttle:{self.scope}:{ident}:{int(window) - 1}', 0
+        )
+        self.remaining = self.period - elapsed
+        self.estimate = (self.previous * self.remaining / self.period
+                         + current)
+        if self.estimate <= self.capacity:
+            return True
+        # Отклоненные запросы не расходуют лимит.
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            pass
+        metrics.incr(f'throttle.{self.scope}.denied')
+        return False
+
+    def wait(self):
+        if not self.previous:
+            return self.remaining
+        excess = self.estimate - self.capacity
+        return min(self.remaining, excess * self.period / self.previous)
@@ -1,7 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+from .views import (BatchView, IngredientViewSet, MetricsView, RecipeViewSet,
+                    TagViewSet)
 
 router_v1 = DefaultRouter()
 router_v1.register('tags', TagViewSet, basename='tags')
@@ -9,5 +10,7 @@ router_v1.register('recipes', RecipeViewSet, basename='recipes')
 router_v1.register('ingredients', IngredientViewSet, basename='ingredients')
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('batch/', BatchView.as_view(), name='batch'),
     path('', include(router_v1.urls)),
 ]
@@ -1,24 +1,39 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db.models import F, Func, Subquery, Sum
+from django.http import HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
-from django_filters.rest_framework import (BooleanFilter, DjangoFilterBackend,
-                                           FilterSet,
+from django_filters.rest_framework import (BooleanFilter, ChoiceFilter,
+                                           DjangoFilterBackend, FilterSet,
                                            ModelMultipleChoiceFilter,
-                                           NumberFilter)
+                                           NumberFilter, OrderingFilter)
+from foodgram import metrics
+from recipe.images import get_variant
 from recipe.models import (AmountIngredient, Favorite, Ingredient, Recipe,
                            ShoppingCart, Tag)
+from recipe.purge import hide
 from rest_framework import permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from .batch import dispatch_batch
+from .coalescing import SingleFlight
+from .fragments import RecipeFragments
+from .ingredient_index import ingredient_index
+from .mixins import (AnonymousPageCacheMixin, ConditionalGetMixin,
+                     SparseFieldsMixin)
 from .permissions import AuthorOrReadOnly
-from .serializers import (AddRecipeSerializer, FavoriteRecipeSerializer,
-                          IngredientSerializer, RecipeSerializer,
-                          TagSerializer)
+from .serializers import (AddRecipeSerializer, CookableRecipeSerializer,
+                          FavoriteRecipeSerializer, IngredientSerializer,
+                          RecipeSerializer, TagSerializer)
+from .throttles import SlidingWindowThrottle
+
+shopping_cart_flight = SingleFlight()
 
 
 class SearchIngredients(SearchFilter):
@@ -31,7 +46,36 @@ class RecipeFilters(FilterSet):
     author = NumberFilter()
     tags = ModelMultipleChoiceFilter(field_name='tags__slug',
                                      queryset=Tag.objects.all(),
-                                     to_field_name='slug')
+                                     to_field_name='slug',
+                                     method='get_tags')
+    tags_mode = ChoiceFilter(choices=(('any', 'any'), ('all', 'all')),
+                             method='get_tags_mode')
+    max_calories = NumberFilter(field_name='total_calories',
+                                lookup_expr='lte')
+    max_cost = NumberFilter(field_name='total_cost', lookup_expr='lte')
+    ordering = OrderingFilter(fields=(('total_calories', 'calories'),
+                                      ('total_cost', 'cost'),
+                                      ('cooking_time', 'cooking_time'),
+                                      ('pub_date', 'pub_date')))
+
+    def get_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        if any(tag.bit is None for tag in value):
+            # Теги без бита не отражены в маске, фильтруем по связям.
+            if self.form.cleaned_data.get('tags_mode') == 'all':
+                for tag in value:
+                    queryset = queryset.filter(tags=tag)
+                return queryset
+            return queryset.filter(tags__in=value).distinct()
+        mask = Tag.get_mask(value)
+        queryset = queryset.alias(tag_bits=F('tags_mask').bitand(mask))
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            return queryset.filter(tag_bits=mask)
+        return queryset.exclude(tag_bits=0)
+
+    def get_tags_mode(self, queryset, name, value):
+        return queryset
 
     def get_is_favorited(self, queryset, name, value):
         if value:
@@ -66,15 +110,57 @@ class TagViewSet(ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(SparseFieldsMixin, AnonymousPageCacheMixin,
+                    ConditionalGetMixin, ModelViewSet):
     """
     Вьюсет для работы с рецептами.
     """
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.filter(is_hidden=False)
     permission_classes = [AuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilters
     pagination_class = PageNumberPagination
+    throttle_scope = None
+    page_cache_namespace = 'recipe_pages'
+    page_cache_metric = 'feed.anonymous'
+    page_cache_sorted_params = ('tags',)
+    validator_fields = ('pk', 'updated_at', 'is_favorited',
+                        'is_in_shopping_cart', 'is_subscribed',
+                        'author__email', 'author__username',
+                        'author__first_name', 'author__last_name', 'total')
+
+    def get_validator_queryset(self, queryset, filtered):
+        total = Recipe.objects.filter(
+            pk__in=filtered.values('pk')
+        ).order_by().annotate(
+            total=Func(F('pk'), function='COUNT')
+        ).values('total')
+        return queryset.with_viewer_flags(self.request.user).annotate(
+            total=Subquery(total)
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'retrieve':
+            return queryset
+        return queryset.only('id', 'updated_at', 'author')
+
+    def get_list_queryset(self, queryset):
+        return queryset.values('id', 'updated_at')
+
+    def get_list_data(self, page):
+        return RecipeFragments(
+            page, context=self.get_serializer_context()
+        ).data
+
+    def get_detail_data(self, instance):
+        data = RecipeFragments(
+            [{'id': instance.pk, 'updated_at': instance.updated_at}],
+            context=self.get_serializer_context()
+        ).data
+        if not data:
+            raise NotFound
+        return data[0]
 
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
@@ -84,20 +170,74 @@ class RecipeViewSet(ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        hide(Recipe, [instance.pk])
+
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def what_to_cook(self, request):
+        try:
+            ingredient_ids = [
+                int(value)
+                for param in request.query_params.getlist('ingredients')
+                for value in param.split(',') if value
+            ]
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': 'Укажите id ингредиентов через запятую.'}
+            )
+        if not ingredient_ids:
+            raise ValidationError({'ingredients': 'Добавьте ингредиент.'})
+        ranking = ingredient_index.rank(ingredient_ids)
+        page = self.paginate_queryset(ranking)
+        if page is not None:
+            return self.get_paginated_response(self.get_cookable_data(page))
+        return Response(self.get_cookable_data(ranking))
+
+    def get_cookable_data(self, ranking):
+        recipes = Recipe.objects.filter(is_hidden=False).in_bulk(
+            [item[0] for item in ranking]
+        )
+        result = []
+        for recipe_id, coverage, missing in ranking:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.coverage = round(coverage, 4)
+            recipe.missing = missing
+            result.append(recipe)
+        return CookableRecipeSerializer(
+            result, many=True, context=self.get_serializer_context()
+        ).data
+
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny],
+            url_path=r'image/(?P<size>\d+x\d+)')
+    def image(self, request, pk, size):
+        if size not in settings.RECIPE_IMAGE_SIZES:
+            raise NotFound('Такого размера картинки нет.')
+        recipe = get_object_or_404(Recipe.objects.only('image'), id=pk,
+                                   is_hidden=False)
+        if not recipe.image:
+            raise NotFound('У рецепта нет картинки.')
+        name = get_variant(recipe.image, size)
+        return HttpResponseRedirect(
+            request.build_absolute_uri(recipe.image.storage.url(name))
+        )
+
     def function_post(self, request, pk, model, error_text):
-        user = request.user
-        model_recipe = model.objects.filter(user=user, recipe_id=pk)
-        recipe = get_object_or_404(Recipe, id=pk)
-        if model_recipe.exists():
+        recipe = get_object_or_404(Recipe, id=pk, is_hidden=False)
+        _, created = model.objects.get_or_create(user=request.user,
+                                                 recipe=recipe)
+        if not created:
             return Response(
                 {'error': error_text}, status=status.HTTP_400_BAD_REQUEST
             )
-        model.objects.create(user=user, recipe_id=pk)
         serializer = FavoriteRecipeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'],
-            permission_classes=[IsAuthenticated])
+            permission_classes=[IsAuthenticated],
+            throttle_classes=[SlidingWindowThrottle],
+            throttle_scope='favorite')
     def favorite(self, request, pk):
         error_text = 'Рецепт уже добавлен в Избранное'
         return self.function_post(request, pk, Favorite, error_text)
@@ -119,7 +259,9 @@ class RecipeViewSet(ModelViewSet):
                                     error400_text)
 
     @action(detail=True, methods=['post'],
-            permission_classes=[IsAuthenticated])
+            permission_classes=[IsAuthenticated],
+            throttle_classes=[SlidingWindowThrottle],
+            throttle_scope='shopping_cart')
     def shopping_cart(self, request, pk):
         error_text = 'Рецепт уже добавлен в список покупок'
         return self.function_post(request, pk, ShoppingCart, error_text)
@@ -132,20 +274,63 @@ class RecipeViewSet(ModelViewSet):
                                     error400_text)
 
     @action(detail=False, methods=['get'],
-            permission_classes=[IsAuthenticated])
+            permission_classes=[IsAuthenticated],
+            throttle_classes=[SlidingWindowThrottle],
+            throttle_scope='download_shopping_cart')
     def download_shopping_cart(self, request):
+        text, coalesced = shopping_cart_flight.do(
+            request.user.pk, lambda: self.get_shopping_cart_text(request.user)
+        )
+        if coalesced:
+            metrics.incr('download_shopping_cart.coalesced')
+        filename = "shopping_cart.txt"
+        response = HttpResponse(text, content_type='text/plain')
+        response['Content-Disposition'] = f'attachment; filename={filename}'
+        return response
+
+    @staticmethod
+    def get_shopping_cart_text(user):
         items = AmountIngredient.objects.filter(
-            recipe__shopcart__user=request.user
+            recipe__shopcart__user=user, recipe__is_hidden=False
         )
         annotate_items = items.values(
             'ingredient__name', 'ingredient__measurement_unit'
         ).annotate(total=Sum('amount')).order_by('-total')
-        text = '\n'.join([
+        return '\n'.join([
             f"{item['ingredient__name']} "
             f"({item['ingredient__measurement_unit']}) - {item['total']}"
             for item in annotate_items
         ])
-        filename = "shopping_cart.txt"
-        response = HttpResponse(text, content_type='text/plain')
-        response['Content-Disposition'] = f'attachment; filename={filename}'
-        return response
+
+
+class MetricsView(APIView):
+    """
+    Счетчики приложения для персонала.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+
+class BatchView(APIView):
+    """
+    Несколько GET-запросов к API за один HTTP-запрос.
+
+    Адреса передаются повторяющимся параметром ?url=, ответы
+    возвращаются списком в том же порядке.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        urls = request.query_params.getlist('url')
+        if not urls:
+            raise ValidationError({'url': 'Укажите хотя бы один адрес.'})
+        if len(urls) > settings.BATCH_MAX_REQUESTS:
+            raise ValidationError({
+                'url': f'Не больше {settings.BATCH_MAX_REQUESTS} адресов.'
+            })
+        metrics.incr('batch.subrequests', len(urls))
+        return Response(
+            dispatch_batch(request, urls, settings.BATCH_WORKERS)
+        )
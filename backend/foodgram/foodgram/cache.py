@@ -0,0 +1,352 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from . import metrics
+
+MISSING = object()
+STATS_FLUSH_INTERVAL = 10
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш процесса с временем жизни записей.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class Stats:
+    """
+    Копит счетчики попаданий в процессе и сбрасывает их в metrics
+    не чаще раза в STATS_FLUSH_INTERVAL секунд, чтобы попадание в L1
+    не превращалось в запись в общий кэш.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._flushed_at = time.monotonic()
+
+    def record(self, name, value=1):
+        with self._lock:
+            self._counts[name] += value
+            if time.monotonic() - self._flushed_at < STATS_FLUSH_INTERVAL:
+                return
+            counts, self._counts = self._counts, Counter()
+            self._flushed_at = time.monotonic()
+        for counter, value in counts.items():
+            metrics.incr(counter, value)
+
+
+stats = Stats()
+
+
+class Namespace:
+    """
+    Двухуровневый кэш пространства имен: LRU процесса (L1) перед общим
+    кэшем Django (L2).
+
+    Ключи содержат версию пространства, которую увеличивают сигналы
+    моделей из settings.CACHE_NAMESPACES; другие процессы видят новую
+    версию не позже чем через version_timeout секунд. Начальная версия
+    берется из time.time_ns(), поэтому вытесненный из кэша ключ версии
+    не возвращает пространство к старым ключам. Значения из L1 общие
+    для потоков, изменять их нельзя.
+    """
+
+    def __init__(self, name, timeout=300, local_timeout=5, local_size=1024,
+                 version_timeout=1, lock_timeout=10, lock_wait=2,
+                 alias='default'):
+        self.name = name
+        self.timeout = timeout
+        self.local_timeout = local_timeout
+        self.version_timeout = version_timeout
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+        self.alias = alias
+        self.local = LRUCache(local_size)
+        self.version_key = f'cache:{name}:version'
+        self._version = None
+        self._version_expires = 0
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def record(self, event):
+        stats.record(f'cache.{self.name}.{event}')
+
+    def get_version(self):
+        if self._version is None or self._version_expires < time.monotonic():
+            self.shared.add(self.version_key, time.time_ns(), None)
+            self._version = self.shared.get(self.version_key)
+            if self._version is None:
+                self._version = time.time_ns()
+            self._version_expires = time.monotonic() + self.version_timeout
+        return self._version
+
+    def bump(self):
+        """
+        Делает недействительными все ключи пространства.
+        """
+        try:
+            self._version = self.shared.incr(self.version_key)
+        except ValueError:
+            self._version = time.time_ns()
+            self.shared.set(self.version_key, self._version, None)
+        self._version_expires = time.monotonic() + self.version_timeout
+        self.local.clear()
+
+    def make_key(self, key):
+        return f'cache:{self.name}:{self.get_version()}:{key}'
+
+    def _get(self, full_key):
+        if self.local_timeout:
+            value = self.local.get(full_key)
+            if value is not MISSING:
+                self.record('l1_hit')
+                return value
+        value = self.shared.get(full_key, MISSING)
+        if value is not MISSING:
+            self.record('l2_hit')
+            if self.local_timeout:
+                self.local.set(full_key, value, self.local_timeout)
+        return value
+
+    def _set(self, full_key, value, timeout):
+        timeout = self.timeout if timeout is None else timeout
+        self.shared.set(full_key, value, timeout)
+        if self.local_timeout:
+            self.local.set(full_key, value, min(timeout, self.local_timeout))
+
+    def get(self, key, default=None):
+        value = self._get(self.make_key(key))
+        if value is MISSING:
+            self.record('miss')
+            return default
+        return value
+
+    def set(self, key, value, timeout=None):
+        self._set(self.make_key(key), value, timeout)
+
+    def delete(self, key):
+        full_key = self.make_key(key)
+        self.local.delete(full_key)
+        self.shared.delete(full_key)
+
+    def get_many(self, keys):
+        """
+        Возвращает словарь найденных значений по исходным ключам.
+        """
+        full_keys = {self.make_key(key): key for key in keys}
+        found = {}
+        remote = []
+        for full_key, key in full_keys.items():
+            value = (self.local.get(full_key) if self.local_timeout
+                     else MISSING)
+            if value is MISSING:
+                remote.append(full_key)
+            else:
+                found[key] = value
+                self.record('l1_hit')
+        if remote:
+            for full_key, value in self.shared.get_many(remote).items():
+                found[full_keys[full_key]] = value
+                self.record('l2_hit')
+                if self.local_timeout:
+                    self.local.set(full_key, value, self.local_timeout)
+        for _ in range(len(full_keys) - len(found)):
+            self.record('miss')
+        return found
+
+    def set_many(self, mapping, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        values = {self.make_key(key): value for key, value in mapping.items()}
+        self.shared.set_many(values, timeout)
+        if self.local_timeout:
+            for full_key, value in values.items():
+                self.local.set(full_key, value,
+                               min(timeout, self.local_timeout))
+
+    def get_or_set(self, key, func, timeout=None):
+        """
+        Возвращает значение ключа, вычисляя его через func при промахе.
+
+        Вычисляет только процесс, захвативший блокировку в общем кэше;
+        остальные до lock_wait секунд ждут появления значения.
+        """
+        full_key = self.make_key(key)
+        value = self._get(full_key)
+        if value is not MISSING:
+            return value
+        lock_key = f'{full_key}:lock'
+        if self.shared.add(lock_key, 1, self.lock_timeout):
+            self.record('miss')
+            try:
+                value = func()
+                self._set(full_key, value, timeout)
+            finally:
+                self.shared.delete(lock_key)
+            return value
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self.shared.get(full_key, MISSING)
+            if value is not MISSING:
+                self.record('wait_hit')
+                return value
+        self.record('lock_timeout')
+        return func()
+
+
+class ChangeLog:
+    """
+    Журнал изменений в общем кэше для индексов в памяти процессов.
+
+    Запись — список id измененных объектов или ALL (изменилось все)
+    под номером, который выдает атомарный incr, поэтому записи
+    параллельных воркеров не теряются. Процессы читают записи после
+    последнего примененного номера; записи живут timeout секунд.
+    """
+    ALL = 'all'
+
+    def __init__(self, name, timeout=600, alias='default'):
+        self.name = name
+        self.timeout = timeout
+        self.alias = alias
+        self.sequence_key = f'changelog:{name}:sequence'
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def get_entry_key(self, sequence):
+        return f'changelog:{self.name}:{sequence}'
+
+    def publish(self, ids=ALL):
+        self.shared.add(self.sequence_key, 0, None)
+        sequence = self.shared.incr(self.sequence_key)
+        self.shared.set(self.get_entry_key(sequence), ids, self.timeout)
+        return sequence
+
+    def publish_on_commit(self, ids=ALL):
+        if ids != self.ALL:
+            ids = list(ids)
+        transaction.on_commit(lambda: self.publish(ids))
+
+    def last(self):
+        return self.shared.get(self.sequence_key, 0)
+
+    def read(self, after, last):
+        """
+        Записи с номерами от after + 1 до last: {номер: значение};
+        отсутствующих в кэше номеров в словаре нет.
+        """
+        keys = {self.get_entry_key(sequence): sequence
+                for sequence in range(after + 1, last + 1)}
+        return {keys[key]: value
+                for key, value in self.shared.get_many(list(keys)).items()}
+
+
+_namespaces = {}
+_namespaces_lock = threading.Lock()
+_changelogs = {}
+
+
+def namespace(name):
+    """
+    Пространство имен кэша с параметрами из settings.CACHE_NAMESPACES.
+    """
+    with _namespaces_lock:
+        if name not in _namespaces:
+            options = settings.CACHE_NAMESPACES[name].get('OPTIONS', {})
+            _namespaces[name] = Namespace(name, **options)
+        return _namespaces[name]
+
+
+def changelog(name):
+    """
+    Журнал изменений name.
+    """
+    with _namespaces_lock:
+        if name not in _changelogs:
+            _changelogs[name] = ChangeLog(name)
+        return _changelogs[name]
+
+
+def bump(*names):
+    """
+    Увеличивает версии пространств после фиксации транзакции.
+    """
+    for name in names:
+        transaction.on_commit(namespace(name).bump)
+
+
+def connect_invalidation():
+    """
+    Подключает сигналы моделей, увеличивающие версии пространств.
+    """
+    dependents = {}
+    for name, config in settings.CACHE_NAMESPACES.items():
+        for label in config.get('MODELS', ()):
+            dependents.setdefault(apps.get_model(label), []).append(name)
+
+    def model_changed(sender, update_fields=None, **kwargs):
+        # Вход пользователя обновляет только last_login.
+        if update_fields == frozenset(('last_login',)):
+            return
+        bump(*dependents.get(sender, ()))
+
+    def relation_changed(sender, action, **kwargs):
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            model_changed(kwargs['model'])
+            model_changed(type(kwargs['instance']))
+
+    for model in dependents:
+        post_save.connect(model_changed, sender=model, weak=False,
+                          dispatch_uid=f'cache:{model._meta.label}:save')
+        post_delete.connect(model_changed, sender=model, weak=False,
+                            dispatch_uid=f'cache:{model._meta.label}:delete')
+        for field in model._meta.many_to_many:
+            m2m_changed.connect(
+                relation_changed, sender=field.remote_field.through,
+                weak=False,
+                dispatch_uid=f'cache:{model._meta.label}:{field.name}'
+            )
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+ATOMIC_CACHE_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django_redis.cache.RedisCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_atomic_cache(app_configs, **kwargs):
+    """
+    Блокировки Namespace.get_or_set, журналы изменений, троттлинг и
+    метрики полагаются на атомарные add и incr общего кэша. Файловый и
+    локальный кэши этого не гарантируют, поэтому в продакшене нужен
+    Redis или Memcached.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in ATOMIC_CACHE_BACKENDS:
+        return []
+    return [Error(
+        f'Кэш {backend} не выполняет add и incr атомарно между процессами.',
+        hint='Укажите CACHE_BACKEND с Redis или Memcached.',
+        id='foodgram.E001',
+    )]
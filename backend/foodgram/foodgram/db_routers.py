@@ -0,0 +1,72 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+REPLICA = 'replica'
+PRIMARY_ONLY_MODELS = {'authtoken.token'}
+
+read_alias = ContextVar('read_alias', default=None)
+
+
+class ReplicaHealth:
+    """
+    Доступность реплики в текущем процессе.
+
+    После ошибки реплика считается недоступной REPLICA_RETRY_SECONDS
+    секунд, и чтение идет с основной базы.
+    """
+
+    def __init__(self, alias=REPLICA):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._down_until = 0
+
+    @property
+    def configured(self):
+        return self.alias in settings.DATABASES
+
+    def mark_down(self):
+        with self._lock:
+            self._down_until = (time.monotonic()
+                                + settings.REPLICA_RETRY_SECONDS)
+        try:
+            connections[self.alias].close()
+        except DatabaseError:
+            pass
+
+    def available(self):
+        if not self.configured or time.monotonic() < self._down_until:
+            return False
+        try:
+            connections[self.alias].ensure_connection()
+        except DatabaseError:
+            self.mark_down()
+            return False
+        return True
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """
+    Отправляет чтение на реплику, если ReplicaMiddleware выбрала ее
+    для текущего запроса; запись и миграции идут в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return 'default'
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
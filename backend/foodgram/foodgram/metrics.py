@@ -0,0 +1,44 @@
+from django.core.cache import cache
+
+PREFIX = 'metrics:'
+NAMES_COUNT_KEY = f'{PREFIX}names:count'
+
+_known_names = set()
+
+
+def register(name):
+    """
+    Добавляет name в общий список счетчиков. Каждое имя получает свой
+    слот через атомарные add и incr, поэтому воркеры не затирают
+    друг другу список.
+    """
+    if cache.add(f'{PREFIX}registered:{name}', 1, None):
+        cache.add(NAMES_COUNT_KEY, 0, None)
+        slot = cache.incr(NAMES_COUNT_KEY)
+        cache.set(f'{PREFIX}name:{slot}', name, None)
+    _known_names.add(name)
+
+
+def incr(name, delta=1):
+    """
+    Увеличивает счетчик name в общем кэше, видимом всем воркерам.
+    """
+    if name not in _known_names:
+        register(name)
+    key = PREFIX + name
+    if cache.add(key, delta, None):
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Ключ вытеснен между add и incr.
+        cache.add(key, delta, None)
+
+
+def snapshot():
+    slots = range(1, cache.get(NAMES_COUNT_KEY, 0) + 1)
+    names = sorted(set(cache.get_many(
+        [f'{PREFIX}name:{slot}' for slot in slots]
+    ).values()))
+    values = cache.get_many([PREFIX + name for name in names])
+    return {name: values.get(PREFIX + name, 0) for name in names}
@@ -0,0 +1,170 @@
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.http import HttpResponse, JsonResponse
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+
+from . import metrics
+from .db_routers import REPLICA, read_alias, replica_health
+from .profiler import profile_request, save_artifact
+
+PIN_PREFIX = 'replica:pin:'
+
+
+def get_replica_views():
+    return tuple(import_string(path) for path in settings.REPLICA_VIEWS)
+
+
+def get_pin_key(request):
+    client = (request.META.get('HTTP_AUTHORIZATION')
+              or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+              or request.META.get('REMOTE_ADDR', ''))
+    return PIN_PREFIX + hashlib.sha1(client.encode()).hexdigest()
+
+
+def use_replica(request, view_func, views):
+    return (request.method in SAFE_METHODS
+            and getattr(view_func, 'cls', None) in views
+            and not cache.get(get_pin_key(request))
+            and replica_health.available())
+
+
+def call_with_replica(request, view_func, call):
+    """
+    Выполняет call() для вложенного запроса (например, подзапроса
+    пакета), который не проходит middleware, с той же маршрутизацией
+    чтения, что и ReplicaMiddleware.
+    """
+    if not replica_health.configured:
+        return call()
+    token = read_alias.set(None)
+    try:
+        if use_replica(request, view_func, get_replica_views()):
+            read_alias.set(REPLICA)
+            metrics.incr('replica.reads')
+            try:
+                return call()
+            except DatabaseError:
+                replica_health.mark_down()
+                read_alias.set(None)
+                metrics.incr('replica.fallback')
+        return call()
+    finally:
+        read_alias.reset(token)
+
+
+class ReplicaMiddleware:
+    """
+    Направляет безопасные запросы к вьюсетам из REPLICA_VIEWS на реплику.
+
+    После успешной записи клиент на REPLICA_PIN_SECONDS секунд
+    закрепляется за основной базой, чтобы видеть свои изменения. Если
+    реплика падает во время запроса, запрос заново проходит обработчик
+    (вложенные middleware и вьюху) с основной базой.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @cached_property
+    def views(self):
+        return get_replica_views()
+
+    def dispatch(self, request):
+        token = read_alias.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            read_alias.reset(token)
+
+    def __call__(self, request):
+        request.replica_failed = False
+        if not replica_health.configured:
+            return self.get_response(request)
+        response = self.dispatch(request)
+        if request.replica_failed:
+            metrics.incr('replica.fallback')
+            response = self.dispatch(request)
+        if (request.method not in SAFE_METHODS
+                and response.status_code < 400):
+            cache.set(get_pin_key(request), True,
+                      settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (not request.replica_failed
+                and use_replica(request, view_func, self.views)):
+            read_alias.set(REPLICA)
+            metrics.incr('replica.reads')
+
+    def process_exception(self, request, exception):
+        if (read_alias.get() != REPLICA
+                or not isinstance(exception, DatabaseError)):
+            return None
+        replica_health.mark_down()
+        request.replica_failed = True
+        # Ответ-заглушка прерывает обработку исключения; __call__
+        # отбрасывает его и повторяет запрос.
+        return HttpResponse(status=503)
+
+
+class ProfilerMiddleware:
+    """
+    Профилирует запрос по заголовку X-Profile или параметру ?_profile
+    от персонала, а также каждый PROFILER_SAMPLE_RATE-й запрос в среднем.
+
+    Артефакт (топ функций, SQL с планами, места выделения памяти)
+    сохраняется в PROFILER_DIR, имя файла возвращается в заголовке
+    X-Profile-Id. Значение inline заменяет ответ самим артефактом;
+    профилирование включают только значения из modes.
+    """
+    header = 'HTTP_X_PROFILE'
+    query_param = '_profile'
+    modes = {'1', 'true', 'yes', 'on', 'inline'}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def is_staff(request):
+        try:
+            user_auth = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        user = user_auth[0] if user_auth else request.user
+        return user.is_staff
+
+    def get_mode(self, request):
+        mode = request.META.get(self.header)
+        if mode is None:
+            mode = request.GET.get(self.query_param)
+        mode = (mode or '').strip().lower()
+        if mode in self.modes and self.is_staff(request):
+            return mode
+        rate = settings.PROFILER_SAMPLE_RATE
+        if rate and random.randrange(rate) == 0:
+            return 'sample'
+        return None
+
+    def __call__(self, request):
+        mode = self.get_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        response, artifact = profile_request(self.get_response, request)
+        if artifact is None:
+            return response
+        name = save_artifact(artifact)
+        metrics.incr('profiler.saved')
+        if mode == 'inline':
+            return JsonResponse(artifact, json_dumps_params={
+                'ensure_ascii': False, 'default': str})
+        if mode != 'sample':
+            response['X-Profile-Id'] = name
+        return response
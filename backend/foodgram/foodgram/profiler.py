@@ -0,0 +1,182 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 20
+EXPLAIN_LIMIT = 10
+
+# В одном процессе может работать только один cProfile.
+profile_lock = threading.Lock()
+
+
+class QueryLog:
+    """
+    Записывает SQL-запросы всех подключений с их длительностью.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def wrapper(self, alias):
+        def execute(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append({
+                    'alias': alias,
+                    'sql': sql,
+                    'params': None if many else params,
+                    'ms': round((time.perf_counter() - started) * 1000, 3),
+                })
+        return execute
+
+    def capture(self, stack):
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(self.wrapper(connection.alias))
+            )
+
+    def explain(self):
+        """
+        Добавляет планы самых долгих SELECT-запросов.
+        """
+        selects = sorted(
+            (query for query in self.queries
+             if query['sql'].lstrip().upper().startswith('SELECT')
+             and query['params'] is not None),
+            key=lambda query: -query['ms']
+        )
+        explained = set()
+        for query in selects:
+            if len(explained) >= EXPLAIN_LIMIT:
+                break
+            if query['sql'] in explained:
+                continue
+            explained.add(query['sql'])
+            connection = connections[query['alias']]
+            prefix = connection.ops.explain_query_prefix()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'{prefix} {query["sql"]}',
+                                   query['params'])
+                    query['explain'] = [
+                        ' '.join(str(column) for column in row)
+                        for row in cursor.fetchall()
+                    ]
+            except DatabaseError as error:
+                query['explain'] = [str(error)]
+
+    def strip_params(self):
+        """
+        Убирает значения параметров: в них бывают токены, пароли и
+        личные данные, а артефакт хранится на диске.
+        """
+        for query in self.queries:
+            query.pop('params', None)
+
+
+def get_top_functions(profiler):
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])
+    return [
+        {
+            'function': f'{filename}:{lineno}({name})',
+            'calls': calls,
+            'total_ms': round(total * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for (filename, lineno, name), (_, calls, total, cumulative, _)
+        in rows[:TOP_FUNCTIONS]
+    ]
+
+
+def get_allocations(before, after):
+    own = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    before = before.filter_traces(own)
+    after = after.filter_traces(own)
+    return [
+        {
+            'line': str(stat.traceback[0]),
+            'size_kb': round(stat.size_diff / 1024, 1),
+            'count': stat.count_diff,
+        }
+        for stat in after.compare_to(before, 'lineno')[:TOP_ALLOCATIONS]
+    ]
+
+
+def profile_request(get_response, request):
+    """
+    Выполняет запрос под cProfile, tracemalloc и записью SQL.
+
+    Возвращает (ответ, артефакт) или (ответ, None), если в процессе
+    уже профилируется другой запрос.
+    """
+    if not profile_lock.acquire(blocking=False):
+        return get_response(request), None
+    started_tracing = not tracemalloc.is_tracing()
+    try:
+        queries = QueryLog()
+        profiler = cProfile.Profile()
+        if started_tracing:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            queries.capture(stack)
+            response = profiler.runcall(get_response, request)
+        duration = time.perf_counter() - started
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        profile_lock.release()
+    queries.explain()
+    queries.strip_params()
+    artifact = {
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 3),
+        'sql_ms': round(sum(query['ms'] for query in queries.queries), 3),
+        'functions': get_top_functions(profiler),
+        'queries': queries.queries,
+        'allocations': get_allocations(before, after),
+        'peak_kb': round(peak / 1024, 1),
+    }
+    return response, artifact
+
+
+def save_artifact(artifact):
+    """
+    Сохраняет артефакт в PROFILER_DIR, оставляя PROFILER_KEEP последних.
+    Каталог и файлы доступны только владельцу процесса.
+    """
+    directory = settings.PROFILER_DIR
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.chmod(directory, 0o700)
+    name = f'{time.time_ns()}-{uuid.uuid4().hex[:8]}.json'
+    fd = os.open(os.path.join(directory, name),
+                 os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as file:
+        json.dump(artifact, file, ensure_ascii=False, indent=1, default=str)
+    with os.scandir(directory) as entries:
+        names = sorted(entry.name for entry in entries
+                       if entry.name.endswith('.json'))
+    for old in names[:-settings.PROFILER_KEEP]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except FileNotFoundError:
+            pass
+    return name
@@ -1,4 +1,6 @@
 import os
+import sys
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -24,6 +26,7 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipe.apps.RecipeConfig',
     'users.apps.UsersConfig',
+    'tasks.apps.TasksConfig',
 ]
 
 MIDDLEWARE = [
@@ -34,6 +37,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.middleware.ProfilerMiddleware',
+    'foodgram.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -68,6 +73,36 @@ DATABASES = {
     }
 }
 
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME',
+                          default=DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST',
+                          default=DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT',
+                          default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+if 'replica' not in DATABASES and sys.argv[1:2] == ['test']:
+    # Тесты маршрутизации чтения работают с зеркалом основной базы.
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.db_routers.ReplicaRouter']
+
+REPLICA_VIEWS = [
+    'api.views.RecipeViewSet',
+    'api.views.TagViewSet',
+    'api.views.IngredientViewSet',
+    'users.views.CustomUserViewSet',
+]
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=5))
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', default=30))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -106,6 +141,7 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'backend_static')
 
 MEDIA_URL = '/backend_media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'backend_media')
+RECIPE_IMAGE_SIZES = ['150x150', '480x480', '960x960']
 
 
 REST_FRAMEWORK = {
@@ -117,10 +153,77 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
     ],
 
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
+    'DEFAULT_THROTTLE_RATES': {
+        'favorite': '30/min',
+        'shopping_cart': '30/min',
+        'subscribe': '30/min',
+        'download_shopping_cart': '10/min',
+    },
+
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
 }
 
+TASKS = {
+    'BACKEND': os.getenv('TASKS_BACKEND',
+                         default='tasks.backends.ThreadPoolBackend'),
+    'OPTIONS': {},
+}
+
+BATCH_MAX_REQUESTS = 10
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', default=1))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            default=os.path.join(tempfile.gettempdir(), 'foodgram_cache')),
+        'TIMEOUT': 300,
+    },
+}
+if CACHES['default']['BACKEND'].endswith('.FileBasedCache'):
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', default=10000)),
+    }
+
+CACHE_NAMESPACES = {
+    'recipe_fragments': {
+        'MODELS': ('recipe.Tag', 'recipe.Ingredient'),
+        'OPTIONS': {'timeout': 3600, 'local_timeout': 30},
+    },
+    'recipe_pages': {
+        'MODELS': ('recipe.Recipe', 'recipe.Tag', 'recipe.Ingredient',
+                   'recipe.AmountIngredient'),
+        'OPTIONS': {'timeout': 60, 'local_timeout': 5},
+    },
+    'users': {
+        'MODELS': ('users.User',),
+        'OPTIONS': {'timeout': 60, 'local_timeout': 0},
+    },
+}
+
+PROFILER_DIR = os.getenv(
+    'PROFILER_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'foodgram_profiles'))
+PROFILER_KEEP = int(os.getenv('PROFILER_KEEP', default=100))
+PROFILER_SAMPLE_RATE = int(os.getenv('PROFILER_SAMPLE_RATE', default=0))
+
+USER_ME_CACHE_TTL = int(os.getenv('USER_ME_CACHE_TTL', default=60))
+
 DJOSER = {
     'HIDE_USERS': False,
     # 'LOGIN_FIELD': 'email',
@@ -128,6 +231,16 @@ DJOSER = {
         "user_create": "users.serializers.CustomUserCreateSerializer",
         "user": "users.serializers.CustomUserSerializer",
     },
+    'EMAIL': {
+        'activation': 'users.email.ActivationEmail',
+        'confirmation': 'users.email.ConfirmationEmail',
+        'password_reset': 'users.email.PasswordResetEmail',
+        'password_changed_confirmation':
+            'users.email.PasswordChangedConfirmationEmail',
+        'username_changed_confirmation':
+            'users.email.UsernameChangedConfirmationEmail',
+        'username_reset': 'users.email.UsernameResetEmail',
+    },
     'PERMISSIONS': {
         'user': ['rest_framework.permissions.AllowAny'],
         'user_list': ['rest_framework.permissions.AllowAny']
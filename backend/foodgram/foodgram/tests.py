@@ -0,0 +1,164 @@
+from collections import Counter
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from recipe.models import Ingredient, Recipe
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import User
+
+from .cache import Namespace
+from .db_routers import REPLICA, replica_health
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+class QueryLog:
+    """
+    Считает запросы по подключениям; с fail_replica запросы
+    к реплике падают, как при ее недоступности.
+    """
+
+    def __init__(self, fail_replica=False):
+        self.fail_replica = fail_replica
+        self.aliases = Counter()
+
+    def wrapper(self, alias):
+        def execute(execute, sql, params, many, context):
+            self.aliases[alias] += 1
+            if alias == REPLICA and self.fail_replica:
+                raise OperationalError('replica is down')
+            return execute(sql, params, many, context)
+        return execute
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        for alias in ('default', REPLICA):
+            self.stack.enter_context(
+                connections[alias].execute_wrapper(self.wrapper(alias))
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stack.close()
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROFILER_SAMPLE_RATE=0)
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    Маршрутизация чтения между основной базой и репликой.
+
+    Реплика в тестах — зеркало основной базы на отдельном подключении,
+    поэтому используется TransactionTestCase: данные видны обоим
+    подключениям только после фиксации.
+    """
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        replica_health._down_until = 0
+        self.user = User.objects.create(
+            email='reader@foodgram.local', username='reader',
+            first_name='reader', last_name='reader'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Рецепт', text='Текст', cooking_time=5
+        )
+        self.recipe.amountingredient.create(
+            ingredient=Ingredient.objects.get_or_create(
+                name='соль', measurement_unit='г')[0],
+            amount=1
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+
+    def tearDown(self):
+        replica_health._down_until = 0
+
+    def test_safe_request_reads_from_replica(self):
+        with QueryLog() as log:
+            response = self.client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Рецепт')
+        self.assertGreater(log.aliases[REPLICA], 0)
+        # С основной базы читается только токен.
+        self.assertEqual(log.aliases['default'], 1)
+
+    def test_write_goes_to_primary(self):
+        with QueryLog() as log:
+            response = self.client.post(
+                f'/api/recipes/{self.recipe.pk}/favorite/'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(log.aliases[REPLICA], 0)
+
+    def test_client_is_pinned_after_write(self):
+        self.client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        with QueryLog() as log:
+            response = self.client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertTrue(response.json()['is_favorited'])
+        self.assertEqual(log.aliases[REPLICA], 0)
+        with QueryLog() as log:
+            APIClient().get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertGreater(log.aliases[REPLICA], 0)
+
+    def test_fallback_to_primary(self):
+        with QueryLog(fail_replica=True) as log:
+            response = self.client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Рецепт')
+        self.assertFalse(replica_health.available())
+        failed = log.aliases[REPLICA]
+        with QueryLog() as log:
+            self.client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(log.aliases[REPLICA], 0)
+        self.assertGreater(failed, 0)
+
+    def test_batch_routes_each_subrequest(self):
+        url = f'/api/batch/?url=/api/recipes/{self.recipe.pk}/'
+        with QueryLog() as log:
+            response = self.client.get(url)
+        self.assertEqual(response.json()[0]['status'], 200)
+        self.assertGreater(log.aliases[REPLICA], 0)
+        self.client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        with QueryLog() as log:
+            response = self.client.get(url)
+        self.assertTrue(response.json()[0]['body']['is_favorited'])
+        self.assertEqual(log.aliases[REPLICA], 0)
+
+    def test_batch_fallback_to_primary(self):
+        url = f'/api/batch/?url=/api/recipes/{self.recipe.pk}/'
+        with QueryLog(fail_replica=True) as log:
+            response = self.client.get(url)
+        self.assertEqual(response.json()[0]['status'], 200)
+        self.assertGreater(log.aliases[REPLICA], 0)
+        self.assertFalse(replica_health.available())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class NamespaceTest(SimpleTestCase):
+    """
+    Версии пространств имен кэша.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.namespace = Namespace('test', local_timeout=0,
+                                   version_timeout=0)
+
+    def test_bump_invalidates_keys(self):
+        self.namespace.set('key', 'value')
+        self.namespace.bump()
+        self.assertIsNone(self.namespace.get('key'))
+
+    def test_evicted_version_does_not_revive_old_keys(self):
+        self.namespace.set('key', 'old')
+        self.namespace.bump()
+        self.namespace.set('key', 'new')
+        cache.delete(self.namespace.version_key)
+        self.assertIsNone(self.namespace.get('key'))
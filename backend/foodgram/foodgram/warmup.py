@@ -0,0 +1,33 @@
+import logging
+
+from django.apps import apps
+from django.db import DatabaseError, connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def warmup():
+    """
+    Прогревает процесс до форка воркеров gunicorn (--preload): метаданные
+    моделей, URL-резолвер, поля сериализаторов и индекс ингредиентов
+    попадают в общую память воркеров.
+    """
+    from api.ingredient_index import ingredient_index
+    from api.serializers import (AddRecipeSerializer, IngredientSerializer,
+                                 RecipeSerializer, TagSerializer)
+    from users.serializers import CustomUserSerializer, FollowSerializer
+
+    for model in apps.get_models():
+        model._meta.get_fields()
+    get_resolver().reverse_dict
+    for serializer_class in (RecipeSerializer, AddRecipeSerializer,
+                             IngredientSerializer, TagSerializer,
+                             CustomUserSerializer, FollowSerializer):
+        serializer_class().fields
+    try:
+        ingredient_index.refresh()
+    except DatabaseError:
+        logger.warning('Индекс ингредиентов не прогрет: база недоступна.')
+    finally:
+        connections.close_all()
@@ -5,3 +5,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
 application = get_wsgi_application()
+
+if os.getenv('DJANGO_WARMUP', '1') == '1':
+    from .warmup import warmup
+
+    warmup()
@@ -0,0 +1,53 @@
+import os
+from importlib import import_module
+
+
+def cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+CPUS = cpu_count()
+
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'sync':
+    default_workers, default_threads = CPUS * 2 + 1, 1
+elif worker_class == 'gthread':
+    default_workers, default_threads = CPUS + 1, 4
+else:
+    # gevent/eventlet: конкурентность дают корутины, а не процессы.
+    default_workers, default_threads = CPUS + 1, 1
+
+workers = int(os.getenv('GUNICORN_WORKERS', default_workers))
+threads = int(os.getenv('GUNICORN_THREADS', default_threads))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Перезапуск воркеров ограничивает рост памяти, jitter разносит
+# перезапуски во времени.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# gevent и eventlet патчат стандартную библиотеку в воркере после форка;
+# приложение, загруженное в мастере до патча, работало бы с
+# блокирующими сокетами и потоками.
+preload_app = worker_class not in ('gevent', 'eventlet')
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+
+
+def post_fork(server, worker):
+    if worker_class in ('gevent', 'eventlet'):
+        try:
+            green = import_module(f'psycogreen.{worker_class}')
+        except ImportError:
+            server.log.warning('psycogreen не установлен: запросы к '
+                               'PostgreSQL будут блокировать воркер.')
+        else:
+            green.patch_psycopg()
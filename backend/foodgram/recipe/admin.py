@@ -1,59 +1,137 @@
 from django.contrib import admin
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 
-from .models import (AmountIngredient, Favorite, Ingredient, Recipe,
-                     ShoppingCart, Tag)
+from .counters import with_count
+from .exchange import export_recipes
+from .models import (AmountIngredient, CounterShard, Favorite, Ingredient,
+                     Recipe, ShoppingCart, ShoppingCartArchive, Tag)
+from .paginators import EstimatedCountPaginator
+from .purge import hide
+
+
+class PurgeAdminMixin:
+    """
+    Удаление скрывает объекты сразу, а строки удаляются в фоне пачками;
+    страница подтверждения не собирает каскад связанных объектов.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        return ([str(obj) for obj in objs],
+                {self.opts.verbose_name_plural: len(objs)},
+                perms_needed, [])
+
+    def delete_model(self, request, obj):
+        hide(self.model, [obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        hide(self.model, queryset.values_list('pk', flat=True))
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'name', 'measurement_unit')
+    list_display = ('pk', 'name', 'measurement_unit', 'calories', 'price')
     search_fields = ('name',)
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
     empty_value_display = '-пусто-'
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'name', 'color', 'slug')
+    list_display = ('pk', 'name', 'color', 'slug', 'bit')
+    search_fields = ('name', 'slug')
     empty_value_display = '-пусто-'
 
 
 class AmountIngredientAdmin(admin.TabularInline):
     model = AmountIngredient
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(PurgeAdminMixin, admin.ModelAdmin):
     list_display = ('pk', 'author', 'name', 'amount_favorites',
                     'amount_ingredients', 'amount_tags')
-    search_fields = ('name',)
-    list_filter = ('author', 'name', 'tags')
-    filter_horizontal = ('ingredients', 'tags')
+    list_select_related = ('author',)
+    search_fields = ('name', 'author__username')
+    list_filter = ('tags', 'is_hidden')
+    autocomplete_fields = ('author', 'tags')
+    readonly_fields = ('favorites_count',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
     inlines = [
         AmountIngredientAdmin,
     ]
-
-    @staticmethod
-    def amount_favorites(obj):
-        return obj.favorites.count()
-
-    @staticmethod
-    def amount_tags(obj):
-        return "\n".join([i[0] for i in obj.tags.values_list('name')])
-
-    @staticmethod
-    def amount_ingredients(obj):
-        return "\n".join([i[0] for i in obj.ingredients.values_list('name')])
+    actions = ['export_jsonl']
+
+    def get_queryset(self, request):
+        queryset = with_count(super().get_queryset(request),
+                              CounterShard.FAVORITES, 'favorites_total')
+        return queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('name')),
+            Prefetch(
+                'amountingredient',
+                queryset=AmountIngredient.objects.select_related(
+                    'ingredient').only('recipe_id', 'ingredient__name')
+            )
+        )
+
+    @admin.action(description='Выгрузить в JSONL')
+    def export_jsonl(self, request, queryset):
+        response = StreamingHttpResponse(
+            export_recipes(Recipe.objects.filter(
+                pk__in=queryset.values('pk'))),
+            content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename=recipes.jsonl'
+        )
+        return response
+
+    @admin.display(description='В избранном')
+    def amount_favorites(self, obj):
+        return obj.favorites_total
+
+    @admin.display(description='Теги')
+    def amount_tags(self, obj):
+        return '\n'.join(tag.name for tag in obj.tags.all())
+
+    @admin.display(description='Ингредиенты')
+    def amount_ingredients(self, obj):
+        return '\n'.join(
+            amount.ingredient.name for amount in obj.amountingredient.all()
+        )
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'user', 'recipe')
+    list_display = ('pk', 'user', 'recipe', 'added')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+@admin.register(ShoppingCartArchive)
+class ShoppingCartArchiveAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user_id', 'recipe_id', 'added', 'archived')
+    search_fields = ('user_id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
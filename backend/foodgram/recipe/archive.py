@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Favorite, ShoppingCart, ShoppingCartArchive
+
+
+def stale_carts(days):
+    """
+    Пользователи, не добавлявшие рецепты в корзину days дней.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    return ShoppingCart.objects.order_by().values('user').annotate(
+        last_added=Max('added')
+    ).filter(last_added__lt=cutoff).values('user')
+
+
+def archive_shopping_carts(days, batch_size=1000):
+    """
+    Переносит заброшенные корзины в архив пачками по batch_size строк.
+
+    Каждая пачка переносится в отдельной транзакции, поэтому блокировки
+    держатся недолго. Возвращает генератор с числом перенесенных строк.
+    """
+    users = stale_carts(days)
+    while True:
+        with transaction.atomic():
+            rows = list(
+                ShoppingCart.objects.select_for_update(skip_locked=True)
+                .filter(user__in=users).order_by('pk')
+                .values_list('pk', 'user_id', 'recipe_id', 'added')
+                [:batch_size]
+            )
+            if not rows:
+                return
+            ShoppingCartArchive.objects.bulk_create(
+                ShoppingCartArchive(user_id=user_id, recipe_id=recipe_id,
+                                    added=added)
+                for _, user_id, recipe_id, added in rows
+            )
+            ShoppingCart.objects.filter(
+                pk__in=[row[0] for row in rows]
+            ).delete()
+        yield len(rows)
+
+
+def partition_favorites_sql(partitions):
+    """
+    SQL перевода таблицы избранного на хеш-секционирование по user_id.
+
+    Первичный ключ секционированной таблицы обязан включать ключ
+    секционирования, поэтому он становится составным (id, user_id).
+    """
+    quote = connection.ops.quote_name
+    meta = Favorite._meta
+    table = meta.db_table
+    new_table = f'{table}_partitioned'
+    sequence = f'{new_table}_id_seq'
+    user = meta.get_field('user')
+    recipe = meta.get_field('recipe')
+    unique = meta.constraints[0].name
+    statements = [
+        f'LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE',
+        f'CREATE SEQUENCE {quote(sequence)}',
+        f'CREATE TABLE {quote(new_table)} ('
+        f'id integer NOT NULL DEFAULT nextval({sequence!r}), '
+        f'{quote(user.column)} integer NOT NULL REFERENCES '
+        f'{quote(user.related_model._meta.db_table)} (id) '
+        f'DEFERRABLE INITIALLY DEFERRED, '
+        f'{quote(recipe.column)} integer NOT NULL REFERENCES '
+        f'{quote(recipe.related_model._meta.db_table)} (id) '
+        f'DEFERRABLE INITIALLY DEFERRED, '
+        f'PRIMARY KEY (id, {quote(user.column)}), '
+        f'CONSTRAINT {quote(unique + "_p")} '
+        f'UNIQUE ({quote(user.column)}, {quote(recipe.column)})'
+        f') PARTITION BY HASH ({quote(user.column)})',
+    ]
+    statements += [
+        f'CREATE TABLE {quote(f"{table}_p{remainder}")} '
+        f'PARTITION OF {quote(new_table)} '
+        f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        for remainder in range(partitions)
+    ]
+    statements += [
+        f'CREATE INDEX {quote(f"{table}_recipe_id_p")} '
+        f'ON {quote(new_table)} ({quote(recipe.column)})',
+        f'INSERT INTO {quote(new_table)} SELECT id, {quote(user.column)}, '
+        f'{quote(recipe.column)} FROM {quote(table)}',
+        f"SELECT setval({sequence!r}, COALESCE(MAX(id), 0) + 1, false) "
+        f'FROM {quote(new_table)}',
+        f'ALTER SEQUENCE {quote(sequence)} OWNED BY {quote(new_table)}.id',
+        f'DROP TABLE {quote(table)}',
+        f'ALTER TABLE {quote(new_table)} RENAME TO {quote(table)}',
+        f'ALTER TABLE {quote(table)} RENAME CONSTRAINT '
+        f'{quote(unique + "_p")} TO {quote(unique)}',
+    ]
+    return statements
+
+
+def is_partitioned(model):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table '
+            'WHERE partrelid = %s::regclass', [model._meta.db_table]
+        )
+        return cursor.fetchone() is not None
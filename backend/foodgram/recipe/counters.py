@@ -0,0 +1,114 @@
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from users.models import Follow, User
+
+from .models import CounterShard, Favorite, Recipe
+
+SHARDS = getattr(settings, 'COUNTER_SHARDS', 16)
+
+TARGETS = {
+    CounterShard.FAVORITES: (Recipe, 'favorites_count'),
+    CounterShard.FOLLOWERS: (User, 'followers_count'),
+    CounterShard.RECIPES: (User, 'recipes_count'),
+}
+
+SOURCES = {
+    Favorite: (CounterShard.FAVORITES, 'recipe_id'),
+    Follow: (CounterShard.FOLLOWERS, 'author_id'),
+    Recipe: (CounterShard.RECIPES, 'author_id'),
+}
+
+
+def increment(kind, object_id, delta=1):
+    """
+    Прибавляет delta к случайному слоту счетчика объекта.
+
+    Конкурирующие запросы попадают в разные строки, поэтому строка
+    рецепта или пользователя не блокируется на каждом добавлении.
+    """
+    slot = random.randrange(SHARDS)
+    shard = CounterShard.objects.filter(kind=kind, object_id=object_id,
+                                        slot=slot)
+    if shard.update(value=F('value') + delta):
+        return
+    try:
+        with transaction.atomic():
+            CounterShard.objects.create(kind=kind, object_id=object_id,
+                                        slot=slot, value=delta)
+    except IntegrityError:
+        shard.update(value=F('value') + delta)
+
+
+def pending(kind, outer_ref='pk'):
+    """
+    Подзапрос с еще не перенесенной суммой слотов для аннотаций.
+    """
+    total = CounterShard.objects.filter(
+        kind=kind, object_id=OuterRef(outer_ref)
+    ).order_by().values('object_id').annotate(
+        total=Sum('value')
+    ).values('total')
+    return Coalesce(Subquery(total), 0)
+
+
+def with_count(queryset, kind, name):
+    """
+    Аннотирует точное значение счетчика: поле родителя и слоты.
+    """
+    field = TARGETS[kind][1]
+    return queryset.annotate(**{name: F(field) + pending(kind)})
+
+
+def get_count(kind, object_id):
+    model, field = TARGETS[kind]
+    value = model.objects.filter(pk=object_id).values_list(
+        field, flat=True
+    ).first() or 0
+    shards = CounterShard.objects.filter(
+        kind=kind, object_id=object_id
+    ).aggregate(total=Sum('value'))['total'] or 0
+    return value + shards
+
+
+def rollup(kind, batch_size=1000):
+    """
+    Переносит накопленные значения слотов в поля родительских строк.
+
+    Слоты обрабатываются пачками под блокировкой; слоты удаленных
+    объектов удаляются. Возвращает число обработанных слотов.
+    """
+    model, field = TARGETS[kind]
+    processed = 0
+    while True:
+        with transaction.atomic():
+            shards = list(
+                CounterShard.objects.select_for_update().filter(
+                    kind=kind
+                ).exclude(value=0).order_by('pk').values_list(
+                    'pk', 'object_id', 'value'
+                )[:batch_size]
+            )
+            if not shards:
+                return processed
+            totals = defaultdict(int)
+            for _, object_id, value in shards:
+                totals[object_id] += value
+            CounterShard.objects.filter(
+                pk__in=[pk for pk, _, _ in shards]
+            ).update(value=0)
+            missing = [
+                object_id for object_id, total in totals.items()
+                if not model.objects.filter(pk=object_id).update(
+                    **{field: F(field) + total}
+                )
+            ]
+            if missing:
+                CounterShard.objects.filter(
+                    kind=kind, object_id__in=missing
+                ).delete()
+        processed += len(shards)
@@ -0,0 +1,208 @@
+import base64
+import json
+import os
+import time
+from collections import Counter
+from itertools import islice
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Prefetch
+from foodgram import cache
+from users.models import User
+
+from . import counters
+from .models import AmountIngredient, CounterShard, Ingredient, Recipe, Tag
+
+
+def export_recipes(queryset, chunk_size=500, images=True):
+    """
+    Генератор строк JSONL: по одному рецепту с тегами, ингредиентами
+    и картинкой в base64 на строку.
+    """
+    queryset = queryset.select_related('author').prefetch_related(
+        Prefetch('tags', Tag.objects.only('slug')),
+        Prefetch('amountingredient',
+                 AmountIngredient.objects.select_related('ingredient')),
+    ).order_by('pk')
+    for recipe in queryset.iterator(chunk_size=chunk_size):
+        record = {
+            'author': recipe.author.email,
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'tags': [tag.slug for tag in recipe.tags.all()],
+            'ingredients': [
+                {'name': item.ingredient.name,
+                 'measurement_unit': item.ingredient.measurement_unit,
+                 'amount': item.amount}
+                for item in recipe.amountingredient.all()
+            ],
+            'image': export_image(recipe.image) if images else None,
+        }
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def export_image(image):
+    if not image:
+        return None
+    try:
+        with image.open('rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+    return {'name': os.path.basename(image.name),
+            'data': base64.b64encode(data).decode()}
+
+
+class RecipeImporter:
+    """
+    Потоковый импорт рецептов из JSONL.
+
+    Строки читаются пачками по batch_size, ссылки на авторов, теги и
+    ингредиенты разрешаются одним запросом на пачку, а запись идет
+    через bulk_create в отдельной точке сохранения. Имена картинок
+    считаются по содержимому заранее, а сами файлы пишутся только после
+    фиксации транзакции, чтобы откат не оставлял файлов без рецептов.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.tags = {tag.slug: tag for tag in Tag.objects.all()}
+        self.imported = 0
+        self.skipped = 0
+
+    def run(self, lines):
+        """
+        Импортирует рецепты и после каждой пачки отдает
+        (импортировано, пропущено, рецептов в секунду).
+        """
+        started = time.monotonic()
+        records = self.parse(lines)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+            elapsed = time.monotonic() - started
+            yield self.imported, self.skipped, self.imported / elapsed
+
+    @staticmethod
+    def parse(lines):
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(
+                    f'Строка {number}: некорректный JSON ({error}).'
+                ) from error
+
+    def resolve_authors(self, batch):
+        emails = {record['author'] for record in batch}
+        return dict(
+            User.objects.filter(email__in=emails).values_list('email', 'id')
+        )
+
+    def resolve_ingredients(self, batch):
+        keys = {
+            (item['name'], item['measurement_unit'])
+            for record in batch for item in record['ingredients']
+        }
+        names = {name for name, _ in keys}
+        ingredients = {
+            (ingredient.name, ingredient.measurement_unit): ingredient
+            for ingredient in Ingredient.objects.filter(name__in=names)
+        }
+        missing = keys - ingredients.keys()
+        if missing:
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in missing],
+                ignore_conflicts=True
+            )
+            ingredients.update({
+                (ingredient.name, ingredient.measurement_unit): ingredient
+                for ingredient in Ingredient.objects.filter(
+                    name__in={name for name, _ in missing})
+            })
+        return ingredients
+
+    @staticmethod
+    def prepare_image(image, images):
+        """
+        Возвращает имя картинки в хранилище и откладывает ее запись
+        в словарь images.
+        """
+        if not image:
+            return None
+        field = Recipe._meta.get_field('image')
+        content = ContentFile(base64.b64decode(image['data']))
+        upload_name = field.generate_filename(None, image['name'])
+        name = field.storage.get_content_name(
+            upload_name, content).replace('\\', '/')
+        images[name] = (upload_name, content)
+        return name
+
+    @staticmethod
+    def save_images(images):
+        storage = Recipe._meta.get_field('image').storage
+        for upload_name, content in images.values():
+            storage.save(upload_name, content)
+
+    def import_batch(self, batch):
+        authors = self.resolve_authors(batch)
+        ingredients = self.resolve_ingredients(batch)
+        recipes, rows, images = [], [], {}
+        for record in batch:
+            author_id = authors.get(record['author'])
+            if author_id is None:
+                self.skipped += 1
+                continue
+            amounts = [
+                (ingredients[item['name'], item['measurement_unit']],
+                 item['amount'])
+                for item in record['ingredients']
+            ]
+            recipes.append(Recipe(
+                author_id=author_id,
+                name=record['name'],
+                text=record['text'],
+                cooking_time=record['cooking_time'],
+                image=self.prepare_image(record.get('image'), images),
+                total_calories=sum(
+                    ingredient.calories * amount
+                    for ingredient, amount in amounts
+                    if ingredient.calories is not None),
+                total_cost=sum(
+                    ingredient.price * amount
+                    for ingredient, amount in amounts
+                    if ingredient.price is not None),
+                tags_mask=Tag.get_mask(
+                    self.tags[slug] for slug in record['tags']
+                    if slug in self.tags),
+            ))
+            rows.append((record['tags'], amounts))
+        through = Recipe.tags.through
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create(recipes)
+            through.objects.bulk_create(
+                through(recipe_id=recipe.pk, tag_id=self.tags[slug].pk)
+                for recipe, (tags, _) in zip(recipes, rows)
+                for slug in tags if slug in self.tags
+            )
+            AmountIngredient.objects.bulk_create(
+                AmountIngredient(recipe_id=recipe.pk,
+                                 ingredient_id=ingredient.pk, amount=amount)
+                for recipe, (_, amounts) in zip(recipes, rows)
+                for ingredient, amount in amounts
+            )
+            authored = Counter(recipe.author_id for recipe in recipes)
+            for author_id, total in authored.items():
+                counters.increment(CounterShard.RECIPES, author_id, total)
+            cache.bump('recipe_pages')
+            cache.changelog('ingredient_index').publish_on_commit(
+                recipe.pk for recipe in recipes)
+            transaction.on_commit(lambda: self.save_images(images))
+        self.imported += len(recipes)
@@ -0,0 +1,59 @@
+import io
+import os
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+VARIANTS_DIR = 'recipe/variants'
+# Файлы, записанные или повторно использованные за это время, могут
+# принадлежать еще не зафиксированному рецепту.
+REUSE_WINDOW = 300
+
+
+def variant_name(name, size):
+    return f'{VARIANTS_DIR}/{size}/{os.path.basename(name)}'
+
+
+def get_variant(image, size):
+    """
+    Возвращает имя уменьшенной копии картинки, создавая ее при первом
+    обращении. Копии хранятся на диске рядом с оригиналами.
+    """
+    storage = image.storage
+    name = variant_name(image.name, size)
+    if storage.exists(name):
+        return name
+    width, height = (int(value) for value in size.split('x'))
+    with image.open('rb'), Image.open(image) as source:
+        image_format = source.format
+        variant = ImageOps.exif_transpose(source)
+        variant.thumbnail((width, height))
+        if image_format == 'JPEG' and variant.mode not in ('RGB', 'L'):
+            variant = variant.convert('RGB')
+        buffer = io.BytesIO()
+        variant.save(buffer, format=image_format)
+    return storage.save_as(name, ContentFile(buffer.getvalue()))
+
+
+def delete_unreferenced(storage, name):
+    """
+    Удаляет картинку и ее уменьшенные копии, если на файл больше
+    не ссылается ни один рецепт: одинаковые картинки у разных рецептов
+    хранятся одним файлом. Недавно использованный файл не удаляется,
+    его позже соберет gc_media.
+    """
+    if not name or Recipe.objects.filter(image=name).exists():
+        return False
+    try:
+        if time.time() - os.path.getmtime(storage.path(name)) < REUSE_WINDOW:
+            return False
+    except FileNotFoundError:
+        return False
+    storage.delete(name)
+    for size in settings.RECIPE_IMAGE_SIZES:
+        storage.delete(variant_name(name, size))
+    return True
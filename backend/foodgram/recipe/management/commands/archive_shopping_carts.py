@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from ...archive import archive_shopping_carts, stale_carts
+from ...models import ShoppingCart
+
+
+class Command(BaseCommand):
+    help = ('Переносит в архив корзины пользователей, не добавлявших '
+            'рецепты указанное число дней.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='только посчитать строки')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            total = ShoppingCart.objects.filter(
+                user__in=stale_carts(options['days'])
+            ).count()
+            self.stdout.write(f'К переносу строк: {total}')
+            return
+        total = 0
+        for moved in archive_shopping_carts(options['days'],
+                                            options['batch_size']):
+            total += moved
+            self.stdout.write(f'Перенесено строк: {total}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, строк: {total}'))
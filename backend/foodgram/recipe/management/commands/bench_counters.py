@@ -0,0 +1,73 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+
+from ...counters import increment, rollup
+from ...models import CounterShard, Recipe
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность счетчика избранного '
+            'в строке рецепта и в слотах при конкурентных добавлениях '
+            'к одному рецепту.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, nargs='+',
+                            default=[1, 4, 16, 32])
+        parser.add_argument('--increments', type=int, default=200,
+                            help='добавлений на поток')
+        parser.add_argument('--recipe', type=int, default=None)
+
+    def handle(self, *args, **options):
+        recipe = Recipe.objects.order_by('pk')
+        if options['recipe'] is not None:
+            recipe = recipe.filter(pk=options['recipe'])
+        recipe_id = recipe.values_list('pk', flat=True).first()
+        if recipe_id is None:
+            raise CommandError('Нет рецептов для замера.')
+        rollup(CounterShard.FAVORITES)
+        strategies = {
+            'row': lambda: Recipe.objects.filter(pk=recipe_id).update(
+                favorites_count=F('favorites_count') + 1
+            ),
+            'sharded': lambda: increment(CounterShard.FAVORITES, recipe_id),
+        }
+        self.stdout.write(f'{"strategy":<10}{"threads":>8}{"ops":>10}'
+                          f'{"ops/s":>12}')
+        for threads in options['threads']:
+            for name, func in strategies.items():
+                ops = threads * options['increments']
+                elapsed = self.run(func, threads, options['increments'])
+                self.stdout.write(f'{name:<10}{threads:>8}{ops:>10}'
+                                  f'{ops / elapsed:>12.0f}')
+                if name == 'row':
+                    Recipe.objects.filter(pk=recipe_id).update(
+                        favorites_count=F('favorites_count') - ops
+                    )
+                else:
+                    increment(CounterShard.FAVORITES, recipe_id, -ops)
+
+    @staticmethod
+    def run(func, threads, increments):
+        barrier = threading.Barrier(threads + 1)
+
+        def worker():
+            barrier.wait()
+            try:
+                for _ in range(increments):
+                    with transaction.atomic():
+                        func()
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        return time.perf_counter() - started
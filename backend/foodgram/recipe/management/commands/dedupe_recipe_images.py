@@ -0,0 +1,40 @@
+import re
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Now
+
+from ...models import Recipe
+
+HASHED_NAME = re.compile(r'/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки рецептов, загруженные до перехода на '
+            'адресацию по содержимому, и удаляет дубликаты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='только посчитать картинки')
+
+    def handle(self, *args, **options):
+        storage = Recipe._meta.get_field('image').storage
+        rows = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('pk', 'image').order_by('pk')
+        moved = removed = 0
+        for pk, name in rows.iterator(chunk_size=500):
+            if HASHED_NAME.search(name):
+                continue
+            moved += 1
+            if options['dry_run'] or not storage.exists(name):
+                continue
+            with storage.open(name, 'rb') as file:
+                new_name = storage.save(name, File(file))
+            Recipe.objects.filter(pk=pk).update(image=new_name,
+                                                updated_at=Now())
+            if not Recipe.objects.filter(image=name).exists():
+                storage.delete(name)
+                removed += 1
+        self.stdout.write(f'Картинок к переносу: {moved}, '
+                          f'удалено файлов: {removed}')
@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from recipe.exchange import export_recipes
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты в формате JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-',
+                            help='файл для выгрузки, по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--no-images', action='store_true')
+
+    def handle(self, *args, **options):
+        lines = export_recipes(Recipe.objects.all(),
+                               chunk_size=options['chunk_size'],
+                               images=not options['no_images'])
+        if options['output'] == '-':
+            sys.stdout.writelines(lines)
+            return
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            file.writelines(lines)
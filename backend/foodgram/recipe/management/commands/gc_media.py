@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from ...media import MediaCollector
+from ...models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки рецептов и их уменьшенные копии, на которые '
+            'не ссылается ни один рецепт.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='только найти файлы без ссылок')
+        parser.add_argument('--quarantine', metavar='DIR',
+                            help='переносить файлы в каталог, а не удалять')
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='не трогать файлы моложе N секунд')
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        collector = MediaCollector(
+            Recipe._meta.get_field('image').storage,
+            min_age=options['min_age'],
+            quarantine=options['quarantine'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+        found = size = removed = 0
+        for found, size, removed in collector.run():
+            self.stdout.write(f'Найдено файлов без ссылок: {found} '
+                              f'({filesizeformat(size)}), '
+                              f'обработано: {removed}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: найдено {found} ({filesizeformat(size)}), '
+            f'{"перенесено" if options["quarantine"] else "удалено"} '
+            f'{removed}'
+        ))
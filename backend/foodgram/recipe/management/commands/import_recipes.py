@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from recipe.exchange import RecipeImporter
+
+
+class Command(BaseCommand):
+    help = 'Загружает рецепты из JSONL, выгруженного export_recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default='-',
+                            help='файл с рецептами, по умолчанию stdin')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        importer = RecipeImporter(batch_size=options['batch_size'])
+        if options['input'] == '-':
+            self.load(importer, sys.stdin)
+            return
+        with open(options['input'], encoding='utf-8') as file:
+            self.load(importer, file)
+
+    def load(self, importer, lines):
+        try:
+            for imported, skipped, rate in importer.run(lines):
+                self.stderr.write(f'Загружено {imported}, '
+                                  f'пропущено {skipped}, '
+                                  f'{rate:.0f} рецептов/с')
+        except ValueError as error:
+            raise CommandError(
+                f'{error} Загружено рецептов до ошибки: {importer.imported}.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено рецептов: {importer.imported}, '
+            f'пропущено (нет автора): {importer.skipped}.'
+        ))
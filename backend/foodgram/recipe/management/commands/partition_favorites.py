@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from ...archive import is_partitioned, partition_favorites_sql
+from ...models import Favorite
+
+
+class Command(BaseCommand):
+    help = ('Переводит таблицу избранного на хеш-секционирование по '
+            'user_id (только PostgreSQL). Таблица блокируется на время '
+            'копирования.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partitions', type=int, default=8)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='вывести SQL без выполнения')
+
+    def handle(self, *args, **options):
+        if options['partitions'] < 2:
+            raise CommandError('Нужно хотя бы две секции.')
+        statements = partition_favorites_sql(options['partitions'])
+        if options['dry_run']:
+            self.stdout.write(';\n'.join(statements) + ';')
+            return
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование доступно только '
+                               'в PostgreSQL.')
+        if is_partitioned(Favorite):
+            raise CommandError('Таблица избранного уже секционирована.')
+        with transaction.atomic(), connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+        self.stdout.write(self.style.SUCCESS(
+            f'Избранное разбито на {options["partitions"]} секций.'
+        ))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from users.models import User
+
+from ...models import Recipe
+from ...purge import PURGE_BATCH_SIZE, hide, purge_hidden_rows
+
+
+class Command(BaseCommand):
+    help = ('Удаляет скрытых пользователей и рецепты пачками. Без id '
+            'дочищает все скрытые строки, например после сбоя воркера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='*', default=[],
+                            help='скрыть и удалить этих пользователей')
+        parser.add_argument('--recipes', type=int, nargs='*', default=[],
+                            help='скрыть и удалить эти рецепты')
+        parser.add_argument('--batch-size', type=int,
+                            default=PURGE_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='только посчитать скрытые строки')
+
+    def handle(self, *args, **options):
+        targets = []
+        for model, ids in ((User, options['users']),
+                           (Recipe, options['recipes'])):
+            if ids and not options['dry_run']:
+                hide(model, ids, enqueue=False)
+            queryset = model.objects.filter(is_hidden=True)
+            if ids:
+                queryset = queryset.filter(pk__in=ids)
+            targets.append(
+                (model, list(queryset.values_list('pk', flat=True)))
+            )
+        if options['dry_run']:
+            for model, ids in targets:
+                self.stdout.write(
+                    f'{model._meta.verbose_name_plural}: {len(ids)}'
+                )
+            return
+        for model, ids in targets:
+            if not ids:
+                continue
+            totals = {}
+            for totals in purge_hidden_rows(model, ids,
+                                            options['batch_size']):
+                self.stdout.write(', '.join(
+                    f'{label}: {total}' for label, total in totals.items()
+                ))
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural} удалены: {dict(totals)}'
+            ))
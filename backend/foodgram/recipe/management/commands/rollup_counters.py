@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ...counters import TARGETS, rollup
+
+
+class Command(BaseCommand):
+    help = ('Переносит значения слотов счетчиков в поля рецептов '
+            'и пользователей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=float, default=None,
+                            help='повторять каждые N секунд')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            for kind in TARGETS:
+                processed = rollup(kind, options['batch_size'])
+                if processed:
+                    self.stdout.write(f'{kind}: перенесено слотов '
+                                      f'{processed}')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,127 @@
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from .images import VARIANTS_DIR
+from .models import Recipe
+
+IMAGES_DIR = Recipe._meta.get_field('image').upload_to.rstrip('/')
+
+
+def walk(root):
+    """
+    Обходит каталог через os.scandir и отдает (путь, stat) файлов,
+    не собирая список целиком.
+    """
+    try:
+        entries = os.scandir(root)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry.path, entry.stat(follow_symlinks=False)
+
+
+def referenced_images(chunk_size=5000):
+    """
+    Имена картинок, на которые ссылаются рецепты (включая скрытые),
+    и их базовые имена для уменьшенных копий.
+    """
+    names = set()
+    rows = Recipe.objects.exclude(image='').exclude(
+        image__isnull=True
+    ).order_by().values_list('image', flat=True)
+    for name in rows.iterator(chunk_size=chunk_size):
+        names.add(name)
+    return names, {os.path.basename(name) for name in names}
+
+
+class MediaCollector:
+    """
+    Находит и удаляет (или переносит в карантин) файлы картинок
+    рецептов и их копий, на которые не ссылается ни один рецепт.
+
+    Файлы моложе min_age секунд не трогаются: картинка записывается
+    на диск раньше, чем фиксируется транзакция с рецептом.
+    """
+
+    def __init__(self, storage, min_age=3600, quarantine=None, workers=8,
+                 chunk_size=5000, dry_run=False):
+        self.storage = storage
+        self.root = storage.location
+        self.min_age = min_age
+        self.quarantine = quarantine
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+
+    def find_orphans(self):
+        """
+        Отдает (имя в хранилище, размер) файлов без ссылок.
+        """
+        names, basenames = referenced_images(self.chunk_size)
+        border = time.time() - self.min_age
+        for directory in (IMAGES_DIR, VARIANTS_DIR):
+            for path, stat in walk(os.path.join(self.root, directory)):
+                if stat.st_mtime > border:
+                    continue
+                name = os.path.relpath(path, self.root).replace('\\', '/')
+                if directory == VARIANTS_DIR:
+                    referenced = os.path.basename(name) in basenames
+                else:
+                    referenced = name in names
+                if not referenced:
+                    yield name, stat.st_size
+
+    def recheck(self, batch):
+        """
+        Убирает из пачки картинки, на которые сослались после
+        загрузки списка ссылок.
+        """
+        used = set(Recipe.objects.filter(
+            image__in=[name for name, _ in batch]
+        ).values_list('image', flat=True))
+        return [(name, size) for name, size in batch if name not in used]
+
+    def remove(self, name):
+        path = os.path.join(self.root, name)
+        try:
+            # Картинку могли загрузить повторно после recheck: хранилище
+            # обновляет время изменения переиспользованного файла.
+            if os.path.getmtime(path) > time.time() - self.min_age:
+                return False
+            if self.quarantine is None:
+                os.remove(path)
+            else:
+                target = os.path.join(self.quarantine, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def run(self):
+        """
+        Возвращает генератор (найдено, байт, удалено) с нарастающими
+        итогами после каждой пачки.
+        """
+        found = size_total = removed = 0
+        orphans = self.find_orphans()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                batch = list(islice(orphans, self.chunk_size))
+                if not batch:
+                    break
+                batch = self.recheck(batch)
+                found += len(batch)
+                size_total += sum(size for _, size in batch)
+                if not self.dry_run:
+                    removed += sum(executor.map(
+                        self.remove, [name for name, _ in batch]
+                    ))
+                yield found, size_total, removed
@@ -1,30 +1,29 @@
 import json
+import os
 
 from django.db import migrations
 
-
-def get_json():
-    try:
-        with open('recipe/data/tags.json', encoding='utf-8') as file:
-            initial_tags = json.load(file)
-            return initial_tags
-    except FileNotFoundError:
-        print('Error')
+DATA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'data', 'tags.json'
+)
 
 
-initial_tags = get_json()
+def get_json():
+    with open(DATA_PATH, encoding='utf-8') as file:
+        return json.load(file)
 
 
 def add_tags(apps, schema_editor):
     Tag = apps.get_model("recipe", "Tag")
-    for tag in initial_tags:
+    for tag in get_json():
         new_tag = Tag(**tag)
         new_tag.save()
 
 
 def remove_tags(apps, schema_editor):
     Tag = apps.get_model("recipe", "Tag")
-    for tag in initial_tags:
+    for tag in get_json():
         Tag.objects.get(slug=tag['slug']).delete()
 
 
@@ -1,31 +1,30 @@
 import json
+import os
 
 from django.db import migrations
 
-
-def get_json():
-    try:
-        with open('recipe/data/ingredients.json', encoding='utf-8') as file:
-            initial_ingredients = json.load(file)
-            return initial_ingredients
-    except FileNotFoundError:
-        print('Error')
+DATA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'data', 'ingredients.json'
+)
 
 
-initial_ingredients = get_json()
+def get_json():
+    with open(DATA_PATH, encoding='utf-8') as file:
+        return json.load(file)
 
 
 def add_ingredients(apps, schema_editor):
     Ingredient = apps.get_model("recipe", "Ingredient")
-    for ingredient in initial_ingredients:
+    for ingredient in get_json():
         new_ingredient = Ingredient(**ingredient)
         new_ingredient.save()
 
 
 def remove_ingredients(apps, schema_editor):
     Ingredient = apps.get_model("recipe", "Ingredient")
-    for ingredient in initial_ingredients:
-        Ingredient.objects.get(name=ingredient['name']).delete()
+    for ingredient in get_json():
+        Ingredient.objects.filter(**ingredient).delete()
 
 
 class Migration(migrations.Migration):
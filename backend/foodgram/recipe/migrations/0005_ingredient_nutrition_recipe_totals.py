@@ -0,0 +1,33 @@
+# Generated by Django 4.1.3 on 2026-10-19 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0004_add_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='calories',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True, verbose_name='Калорийность единицы'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True, verbose_name='Цена единицы'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='total_calories',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=12, verbose_name='Калорийность'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='total_cost',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=12, verbose_name='Стоимость'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.3 on 2026-10-19 08:01
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0006_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='amountingredient',
+            options={'ordering': ['id'], 'verbose_name': 'Количество ингредиента'},
+        ),
+        migrations.AlterModelOptions(
+            name='tag',
+            options={'ordering': ['id'], 'verbose_name': 'Тег', 'verbose_name_plural': 'Теги'},
+        ),
+    ]
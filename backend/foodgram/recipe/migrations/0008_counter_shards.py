@@ -0,0 +1,57 @@
+# Generated by Django 4.1.3 on 2026-10-19 08:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    Favorite = apps.get_model('recipe', 'Favorite')
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+    Recipe.objects.update(favorites_count=count(Favorite, 'recipe'))
+    User.objects.update(followers_count=count(Follow, 'author'),
+                        recipes_count=count(Recipe, 'author'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_tag_amountingredient_ordering'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe.favorites', 'Добавления рецепта в избранное'), ('user.followers', 'Подписчики автора'), ('user.recipes', 'Рецепты автора')], max_length=32, verbose_name='Счетчик')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID объекта')),
+                ('slot', models.PositiveSmallIntegerField(verbose_name='Слот')),
+                ('value', models.IntegerField(default=0, verbose_name='Не перенесенное значение')),
+            ],
+            options={
+                'verbose_name': 'Слот счетчика',
+                'verbose_name_plural': 'Слоты счетчиков',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.IntegerField(default=0, verbose_name='В избранном'),
+        ),
+        migrations.AddConstraint(
+            model_name='countershard',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id', 'slot'), name='unique_counter_shard'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.1.3 on 2026-10-19 08:14
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0008_counter_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartArchive',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.PositiveIntegerField(db_index=True, verbose_name='ID пользователя')),
+                ('recipe_id', models.PositiveIntegerField(verbose_name='ID рецепта')),
+                ('added', models.DateTimeField(verbose_name='Дата добавления')),
+                ('archived', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+            ],
+            options={
+                'verbose_name': 'Архив корзины',
+                'verbose_name_plural': 'Архив корзин',
+            },
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='added',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.3 on 2026-10-19 08:15
+
+from django.db import migrations, models
+import recipe.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0009_shopping_cart_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(default=None, null=True, storage=recipe.storage.recipe_image_storage, upload_to='recipe/images/', verbose_name='Картинка'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.1.3 on 2026-10-19 08:21
+
+import django.core.validators
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def backfill_tags_mask(apps, schema_editor):
+    Tag = apps.get_model('recipe', 'Tag')
+    Recipe = apps.get_model('recipe', 'Recipe')
+    bits = {}
+    for bit, tag in enumerate(Tag.objects.order_by('id')):
+        tag.bit = bit
+        tag.save(update_fields=['bit'])
+        bits[tag.id] = bit
+    masks = {}
+    rows = Recipe.tags.through.objects.order_by('recipe_id').values_list(
+        'recipe_id', 'tag_id')
+    for recipe_id, tag_id in rows.iterator(chunk_size=BATCH_SIZE):
+        masks[recipe_id] = masks.get(recipe_id, 0) | 1 << bits[tag_id]
+        if len(masks) > BATCH_SIZE:
+            last = masks.pop(recipe_id)
+            Recipe.objects.bulk_update(
+                [Recipe(pk=pk, tags_mask=mask) for pk, mask in masks.items()],
+                ['tags_mask'])
+            masks = {recipe_id: last}
+    Recipe.objects.bulk_update(
+        [Recipe(pk=pk, tags_mask=mask) for pk, mask in masks.items()],
+        ['tags_mask'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0010_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Маска тегов'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, unique=True, validators=[django.core.validators.MaxValueValidator(62)], verbose_name='Бит в маске тегов'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.RunPython(backfill_tags_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.3 on 2026-10-19 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0011_tag_bits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='is_hidden',
+            field=models.BooleanField(db_index=True, default=False, help_text='Рецепт удаляется в фоне', verbose_name='Скрыт'),
+        ),
+    ]
@@ -1,6 +1,13 @@
-from django.core.validators import MinValueValidator
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from users.models import User
+from django.db.models import (DecimalField, Exists, ExpressionWrapper, F,
+                              OuterRef, Subquery, Sum, Value)
+from django.db.models.functions import Coalesce, Now
+from users.models import Follow, User
+
+from .storage import recipe_image_storage
+
+MAX_TAG_BIT = 62
 
 
 class Ingredient(models.Model):
@@ -12,6 +19,20 @@ class Ingredient(models.Model):
         'Единица измерения',
         max_length=200
     )
+    calories = models.DecimalField(
+        'Калорийность единицы',
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+    price = models.DecimalField(
+        'Цена единицы',
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
 
     class Meta:
         ordering = ['name']
@@ -42,14 +63,108 @@ class Tag(models.Model):
         unique=True,
         max_length=200,
     )
+    bit = models.PositiveSmallIntegerField(
+        'Бит в маске тегов',
+        unique=True,
+        null=True,
+        editable=False,
+        validators=(MaxValueValidator(MAX_TAG_BIT),)
+    )
 
     class Meta:
+        ordering = ['id']
         verbose_name = 'Тег'
         verbose_name_plural = 'Теги'
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            used = set(Tag.objects.exclude(bit=None).values_list(
+                'bit', flat=True))
+            free = [bit for bit in range(MAX_TAG_BIT + 1) if bit not in used]
+            if not free:
+                raise ValueError('Свободных битов для тегов не осталось.')
+            self.bit = free[0]
+        super().save(*args, **kwargs)
+
+    @property
+    def mask(self):
+        """
+        Бит тега в маске; у тега, созданного в обход save() (bulk_create,
+        loaddata), бита нет и маска нулевая.
+        """
+        if self.bit is None:
+            return 0
+        return 1 << self.bit
+
+    @staticmethod
+    def get_mask(tags):
+        mask = 0
+        for tag in tags:
+            mask |= tag.mask
+        return mask
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def update_totals(self):
+        """
+        Пересчитывает калорийность и стоимость рецептов одним UPDATE.
+        """
+        amounts = AmountIngredient.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe')
+        totals = {}
+        for total_field, field in (('total_calories', 'calories'),
+                                   ('total_cost', 'price')):
+            total = amounts.annotate(total=Sum(ExpressionWrapper(
+                F('amount') * F(f'ingredient__{field}'),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ))).values('total')
+            totals[total_field] = Coalesce(Subquery(total), 0,
+                                           output_field=DecimalField())
+        return self.update(updated_at=Now(), **totals)
+
+    def update_tags_mask(self, batch_size=5000):
+        """
+        Пересчитывает маску тегов рецептов по таблице связей.
+        """
+        through = Recipe.tags.through
+        recipe_ids = list(self.order_by().values_list('pk', flat=True))
+        for start in range(0, len(recipe_ids), batch_size):
+            masks = dict.fromkeys(recipe_ids[start:start + batch_size], 0)
+            rows = through.objects.filter(
+                recipe_id__in=list(masks), tag__bit__isnull=False
+            ).values_list('recipe_id', 'tag__bit')
+            for recipe_id, bit in rows:
+                masks[recipe_id] |= 1 << bit
+            Recipe.objects.bulk_update(
+                [Recipe(pk=pk, tags_mask=mask) for pk, mask in masks.items()],
+                ['tags_mask'], batch_size=batch_size
+            )
+
+    def with_viewer_flags(self, user):
+        """
+        Аннотирует рецепты признаками избранного, корзины и подписки
+        на автора для пользователя user.
+        """
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+                is_subscribed=Value(False)
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_subscribed=Exists(Follow.objects.filter(
+                user=user, author=OuterRef('author')))
+        )
+
 
 class Recipe(models.Model):
     author = models.ForeignKey(
@@ -65,6 +180,7 @@ class Recipe(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='recipe/images/',
+        storage=recipe_image_storage,
         null=True,
         default=None
     )
@@ -88,7 +204,39 @@ class Recipe(models.Model):
         validators=(MinValueValidator(
             1, message='Время должно быть больше 1 минуты'),),
     )
-    pub_date = models.DateTimeField(auto_now_add=True)
+    pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    total_calories = models.DecimalField(
+        'Калорийность',
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        db_index=True
+    )
+    total_cost = models.DecimalField(
+        'Стоимость',
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        db_index=True
+    )
+    favorites_count = models.IntegerField(
+        'В избранном',
+        default=0
+    )
+    tags_mask = models.BigIntegerField(
+        'Маска тегов',
+        default=0,
+        editable=False
+    )
+    is_hidden = models.BooleanField(
+        'Скрыт',
+        default=False,
+        db_index=True,
+        help_text='Рецепт удаляется в фоне'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
@@ -119,6 +267,7 @@ class AmountIngredient(models.Model):
     )
 
     class Meta:
+        ordering = ['id']
         verbose_name = 'Количество ингредиента'
         constraints = (
             models.UniqueConstraint(
@@ -144,6 +293,11 @@ class ShoppingCart(models.Model):
         related_name='shopcart',
         verbose_name='Рецепт',
     )
+    added = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Корзина'
@@ -159,6 +313,30 @@ class ShoppingCart(models.Model):
         return f'{self.user}, {self.recipe}'
 
 
+class ShoppingCartArchive(models.Model):
+    user_id = models.PositiveIntegerField(
+        'ID пользователя',
+        db_index=True
+    )
+    recipe_id = models.PositiveIntegerField(
+        'ID рецепта'
+    )
+    added = models.DateTimeField(
+        'Дата добавления'
+    )
+    archived = models.DateTimeField(
+        'Дата архивации',
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Архив корзины'
+        verbose_name_plural = 'Архив корзин'
+
+    def __str__(self):
+        return f'{self.user_id}, {self.recipe_id}'
+
+
 class Favorite(models.Model):
     user = models.ForeignKey(
         User,
@@ -185,3 +363,43 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f'{self.user}, {self.recipe}'
+
+
+class CounterShard(models.Model):
+    FAVORITES = 'recipe.favorites'
+    FOLLOWERS = 'user.followers'
+    RECIPES = 'user.recipes'
+    KIND_CHOICES = (
+        (FAVORITES, 'Добавления рецепта в избранное'),
+        (FOLLOWERS, 'Подписчики автора'),
+        (RECIPES, 'Рецепты автора'),
+    )
+
+    kind = models.CharField(
+        'Счетчик',
+        max_length=32,
+        choices=KIND_CHOICES
+    )
+    object_id = models.PositiveIntegerField(
+        'ID объекта'
+    )
+    slot = models.PositiveSmallIntegerField(
+        'Слот'
+    )
+    value = models.IntegerField(
+        'Не перенесенное значение',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Слот счетчика'
+        verbose_name_plural = 'Слоты счетчиков'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id', 'slot'],
+                name='unique_counter_shard'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id}#{self.slot} = {self.value}'
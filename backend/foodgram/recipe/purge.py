@@ -0,0 +1,161 @@
+import logging
+from collections import Counter
+
+from django.apps import apps
+from django.db import connection, models, transaction
+from foodgram import cache
+from tasks.dispatch import task
+from users.models import User
+
+from . import counters
+from .models import CounterShard, Recipe
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 500
+
+
+def get_dependents(model):
+    """
+    Модели, строки которых удаляются каскадом вместе с model:
+    (модель, поле внешнего ключа, on_delete).
+    """
+    dependents = []
+    for relation in model._meta.related_objects:
+        if relation.many_to_many:
+            through = relation.through
+            if through._meta.auto_created:
+                field = relation.field.m2m_reverse_field_name()
+                dependents.append((through, field, models.CASCADE))
+            continue
+        dependents.append((relation.related_model, relation.field.name,
+                           relation.on_delete))
+    for field in model._meta.local_many_to_many:
+        through = field.remote_field.through
+        if through._meta.auto_created:
+            dependents.append((through, field.m2m_field_name(),
+                               models.CASCADE))
+    return dependents
+
+
+def adjust_counters(model, ids):
+    kind, field = counters.SOURCES[model]
+    totals = Counter(
+        model._base_manager.select_for_update().filter(
+            pk__in=ids
+        ).order_by().values_list(field, flat=True)
+    )
+    for object_id, total in totals.items():
+        counters.increment(kind, object_id, -total)
+
+
+def delete_shards(model, ids):
+    """
+    Удаляет слоты счетчиков удаляемых объектов model, в том числе
+    поправки, внесенные при удалении их зависимых строк.
+    """
+    kinds = [kind for kind, (target, _) in counters.TARGETS.items()
+             if target is model]
+    if kinds:
+        CounterShard.objects.filter(kind__in=kinds,
+                                    object_id__in=ids).delete()
+
+
+def delete_rows(model, ids):
+    """
+    Удаляет строки model одним DELETE ... WHERE pk IN (...) без
+    загрузки объектов и сигналов; счетчики поправляются вручную.
+    """
+    quote = connection.ops.quote_name
+    opts = model._meta
+    placeholders = ', '.join(['%s'] * len(ids))
+    with transaction.atomic():
+        if model in counters.SOURCES:
+            adjust_counters(model, ids)
+        delete_shards(model, ids)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote(opts.db_table)} '
+                f'WHERE {quote(opts.pk.column)} IN ({placeholders})',
+                list(ids)
+            )
+            return cursor.rowcount
+
+
+def purge(model, ids, batch_size=PURGE_BATCH_SIZE):
+    """
+    Удаляет строки model с зависимыми строками пачками по batch_size.
+
+    Зависимые строки удаляются раньше родителей, каждая пачка — в своей
+    транзакции, поэтому прерванное удаление можно продолжить.
+    Возвращает генератор пар (модель, число удаленных строк).
+    """
+    for related, field, on_delete in get_dependents(model):
+        if on_delete not in (models.CASCADE, models.SET_NULL):
+            continue
+        rows = related._base_manager.filter(
+            **{f'{field}__in': ids}
+        ).order_by()
+        if on_delete is models.SET_NULL:
+            rows.update(**{field: None})
+            continue
+        while True:
+            chunk = list(rows.values_list('pk', flat=True)[:batch_size])
+            if not chunk:
+                break
+            yield from purge(related, chunk, batch_size)
+    deleted = delete_rows(model, ids)
+    if deleted:
+        yield model, deleted
+
+
+def hide(model, ids, enqueue=True):
+    """
+    Скрывает рецепты или пользователей сразу и ставит их удаление
+    в фоновую очередь.
+    """
+    ids = list(ids)
+    with transaction.atomic():
+        if model is User:
+            User.objects.filter(pk__in=ids).update(is_hidden=True,
+                                                   is_active=False)
+            recipes = Recipe.objects.filter(author__in=ids)
+            recipe_ids = list(recipes.values_list('pk', flat=True))
+            recipes.update(is_hidden=True)
+        else:
+            model.objects.filter(pk__in=ids).update(is_hidden=True)
+            recipe_ids = ids
+        cache.bump('recipe_pages', 'users')
+        if recipe_ids:
+            cache.changelog('ingredient_index').publish_on_commit(
+                recipe_ids)
+        if enqueue:
+            purge_hidden.delay(model._meta.label, ids)
+
+
+def purge_hidden_rows(model, ids, batch_size=PURGE_BATCH_SIZE):
+    """
+    Удаляет скрытые строки model из ids. Возвращает генератор
+    {метка модели: удалено строк} с нарастающими итогами.
+    """
+    ids = list(model.objects.filter(pk__in=ids, is_hidden=True).values_list(
+        'pk', flat=True))
+    totals = Counter()
+    for start in range(0, len(ids), batch_size):
+        for deleted_model, deleted in purge(
+                model, ids[start:start + batch_size], batch_size):
+            totals[deleted_model._meta.label] += deleted
+            yield totals
+    if ids:
+        cache.bump('recipe_pages', 'recipe_fragments', 'users')
+        if model is Recipe:
+            cache.changelog('ingredient_index').publish_on_commit(ids)
+
+
+@task
+def purge_hidden(label, ids):
+    model = apps.get_model(label)
+    totals = {}
+    for totals in purge_hidden_rows(model, ids):
+        logger.info('Удаление %s %s: %s', label, ids[:10], dict(totals))
+    logger.info('Удаление %s завершено: %s', label, dict(totals))
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором имя файла — sha256 его содержимого.
+
+    Одинаковые картинки хранятся один раз, а повторная отправка той же
+    картинки (например, в PATCH) не приводит к записи на диск.
+    """
+
+    @staticmethod
+    def get_digest(content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def get_content_name(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = self.get_digest(content)
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        name = self.get_content_name(name, content)
+        try:
+            # Повторно использованный файл получает свежее время
+            # изменения, чтобы сборка мусора не удалила его до фиксации
+            # ссылающегося рецепта.
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return self.save_as(name, content)
+        return name
+
+    def save_as(self, name, content):
+        """
+        Атомарно записывает файл под именем name, заменяя существующий.
+        """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    file.write(chunk)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return name.replace('\\', '/')
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def recipe_image_storage():
+    return content_addressed_storage
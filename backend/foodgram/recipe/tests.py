@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from foodgram.tests import LOCMEM_CACHES
+from users.models import Follow, User
+
+from . import counters
+from .images import delete_unreferenced
+from .media import IMAGES_DIR, MediaCollector
+from .models import CounterShard
+from .purge import hide, purge_hidden_rows
+from .storage import ContentAddressedStorage
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PurgeTest(TestCase):
+    """
+    Фоновое удаление скрытых пользователей.
+    """
+
+    def setUp(self):
+        self.reader, self.author = (
+            User.objects.create(email=f'{name}@foodgram.local',
+                                username=name, first_name=name,
+                                last_name=name)
+            for name in ('reader', 'author')
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+
+    def test_counters_of_purged_user(self):
+        hide(User, [self.author.pk], enqueue=False)
+        for _ in purge_hidden_rows(User, [self.author.pk]):
+            pass
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(
+            CounterShard.objects.filter(object_id=self.author.pk).exists()
+        )
+        self.assertEqual(
+            counters.get_count(CounterShard.FOLLOWERS, self.reader.pk), 0
+        )
+
+
+class MediaTest(TestCase):
+    """
+    Повторно использованные картинки не удаляются как осиротевшие.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def save(self, content=b'image', age=0):
+        name = self.storage.save(f'{IMAGES_DIR}/dish.png',
+                                 ContentFile(content))
+        if age:
+            stamp = time.time() - age
+            os.utime(self.storage.path(name), (stamp, stamp))
+        return name
+
+    def get_age(self, name):
+        return time.time() - os.path.getmtime(self.storage.path(name))
+
+    def collect(self):
+        collector = MediaCollector(self.storage, min_age=60, workers=1)
+        return list(collector.run())[-1]
+
+    def test_reuse_refreshes_mtime(self):
+        name = self.save(age=3600)
+        self.assertEqual(self.save(), name)
+        self.assertLess(self.get_age(name), 60)
+
+    def test_gc_skips_recently_used(self):
+        old = self.save(b'old', age=3600)
+        reused = self.save(b'reused', age=3600)
+        self.save(b'reused')
+        self.assertEqual(self.collect(), (1, 3, 1))
+        self.assertFalse(self.storage.exists(old))
+        self.assertTrue(self.storage.exists(reused))
+
+    def test_replaced_image_kept_within_reuse_window(self):
+        name = self.save()
+        self.assertFalse(delete_unreferenced(self.storage, name))
+        self.assertTrue(self.storage.exists(name))
+        self.save(age=3600)
+        self.assertTrue(delete_unreferenced(self.storage, name))
+        self.assertFalse(self.storage.exists(name))
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_at', 'created')
+    list_filter = ('status',)
+    search_fields = ('name',)
+    empty_value_display = '-пусто-'
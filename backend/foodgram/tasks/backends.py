@@ -0,0 +1,112 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def execute(name, args, kwargs):
+    return import_string(name)(*args, **kwargs)
+
+
+class SyncBackend:
+    """
+    Выполняет задачу сразу в текущем потоке. Используется в тестах.
+    """
+
+    def enqueue(self, name, args, kwargs):
+        execute(name, args, kwargs)
+
+
+class ThreadPoolBackend:
+    """
+    Выполняет задачи в пуле потоков текущего процесса после коммита
+    транзакции. Подходит для одного узла без отдельного воркера.
+    """
+
+    def __init__(self, workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix='tasks')
+
+    def enqueue(self, name, args, kwargs):
+        transaction.on_commit(
+            lambda: self.executor.submit(self.run, name, args, kwargs)
+        )
+
+    @staticmethod
+    def run(name, args, kwargs):
+        try:
+            execute(name, args, kwargs)
+        except Exception:
+            logger.exception('Задача %s завершилась ошибкой', name)
+        finally:
+            connection.close()
+
+
+class DatabaseBackend:
+    """
+    Надежная очередь в таблице Task, которую разбирает команда
+    run_worker. Задача записывается в той же транзакции, что и данные.
+    """
+
+    def __init__(self, max_attempts=3, retry_delay=60, stale_timeout=600):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.stale_timeout = stale_timeout
+
+    def enqueue(self, name, args, kwargs):
+        Task.objects.create(name=name, args=list(args), kwargs=kwargs)
+
+    def requeue_stale(self):
+        """
+        Возвращает в очередь задачи упавших воркеров.
+        """
+        border = timezone.now() - timedelta(seconds=self.stale_timeout)
+        return Task.objects.filter(
+            status=Task.RUNNING, run_at__lt=border
+        ).update(status=Task.PENDING)
+
+    def claim(self, limit):
+        now = timezone.now()
+        with transaction.atomic():
+            tasks = list(
+                Task.objects.select_for_update(skip_locked=True).filter(
+                    status=Task.PENDING, run_at__lte=now
+                )[:limit]
+            )
+            Task.objects.filter(pk__in=[task.pk for task in tasks]).update(
+                status=Task.RUNNING, run_at=now, attempts=F('attempts') + 1
+            )
+        return tasks
+
+    def run_pending(self, limit=10):
+        tasks = self.claim(limit)
+        for task in tasks:
+            try:
+                execute(task.name, task.args, task.kwargs)
+            except Exception as error:
+                logger.exception('Задача %s завершилась ошибкой', task.name)
+                self.fail(task, error)
+            else:
+                Task.objects.filter(pk=task.pk).delete()
+        return len(tasks)
+
+    def fail(self, task, error):
+        attempts = task.attempts + 1
+        if attempts < self.max_attempts:
+            status = Task.PENDING
+        else:
+            status = Task.FAILED
+        Task.objects.filter(pk=task.pk).update(
+            status=status,
+            run_at=timezone.now() + timedelta(
+                seconds=self.retry_delay * attempts),
+            error=repr(error)
+        )
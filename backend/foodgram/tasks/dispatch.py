@@ -0,0 +1,33 @@
+import functools
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+@functools.lru_cache(maxsize=None)
+def get_backend():
+    config = settings.TASKS
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+class TaskFunction:
+    """
+    Обертка функции-задачи: вызов выполняет ее сразу, delay() ставит
+    в очередь настроенного бэкенда. Аргументы должны сериализоваться
+    в JSON.
+    """
+
+    def __init__(self, func):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        get_backend().enqueue(self.name, args, kwargs)
+
+
+def task(func):
+    return TaskFunction(func)
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from tasks.dispatch import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Разбирает очередь фоновых задач из базы данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=10)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='пауза в секундах при пустой очереди')
+        parser.add_argument('--once', action='store_true',
+                            help='выполнить доступные задачи и выйти')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if not hasattr(backend, 'run_pending'):
+            raise CommandError('run_worker работает только с '
+                               'tasks.backends.DatabaseBackend.')
+        while True:
+            close_old_connections()
+            backend.requeue_stale()
+            done = backend.run_pending(options['batch'])
+            if done:
+                self.stdout.write(f'Выполнено задач: {done}')
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,60 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        'Функция',
+        max_length=255
+    )
+    args = models.JSONField(
+        'Позиционные аргументы',
+        default=list
+    )
+    kwargs = models.JSONField(
+        'Именованные аргументы',
+        default=dict
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Попыток',
+        default=0
+    )
+    run_at = models.DateTimeField(
+        'Запустить после',
+        default=timezone.now
+    )
+    created = models.DateTimeField(
+        'Создана',
+        auto_now_add=True
+    )
+    error = models.TextField(
+        'Последняя ошибка',
+        blank=True
+    )
+
+    class Meta:
+        ordering = ['run_at']
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='task_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
@@ -1,19 +1,43 @@
 from django.contrib import admin
+from recipe.admin import PurgeAdminMixin
+from recipe.counters import with_count
+from recipe.models import CounterShard
+from recipe.paginators import EstimatedCountPaginator
 
 from .models import Follow, User
 
 
-class UserAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'username', 'email', 'first_name', 'last_name')
+class UserAdmin(PurgeAdminMixin, admin.ModelAdmin):
+    list_display = ('pk', 'username', 'email', 'first_name', 'last_name',
+                    'amount_followers', 'amount_recipes')
     search_fields = ('username', 'email',)
-    list_filter = ('username', 'email')
+    list_filter = ('is_staff', 'is_active', 'is_hidden')
+    readonly_fields = ('followers_count', 'recipes_count')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        queryset = with_count(super().get_queryset(request),
+                              CounterShard.FOLLOWERS, 'followers_total')
+        return with_count(queryset, CounterShard.RECIPES, 'recipes_total')
+
+    @admin.display(description='Подписчиков')
+    def amount_followers(self, obj):
+        return obj.followers_total
+
+    @admin.display(description='Рецептов')
+    def amount_recipes(self, obj):
+        return obj.recipes_total
+
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'author')
-    search_fields = ('user', 'author')
-    list_filter = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    autocomplete_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
@@ -0,0 +1,46 @@
+from django.conf import settings
+from djoser import email
+
+from .jobs import send_email
+
+
+class BackgroundEmailMixin:
+    """
+    Рендерит письмо djoser в запросе, а отправляет фоновой задачей.
+    """
+
+    def send(self, to, *args, **kwargs):
+        self.render()
+        send_email.delay(
+            subject=self.subject,
+            body=self.body,
+            from_email=kwargs.get('from_email', settings.DEFAULT_FROM_EMAIL),
+            to=list(to),
+            html=self.html
+        )
+
+
+class ActivationEmail(BackgroundEmailMixin, email.ActivationEmail):
+    pass
+
+
+class ConfirmationEmail(BackgroundEmailMixin, email.ConfirmationEmail):
+    pass
+
+
+class PasswordResetEmail(BackgroundEmailMixin, email.PasswordResetEmail):
+    pass
+
+
+class PasswordChangedConfirmationEmail(
+        BackgroundEmailMixin, email.PasswordChangedConfirmationEmail):
+    pass
+
+
+class UsernameChangedConfirmationEmail(
+        BackgroundEmailMixin, email.UsernameChangedConfirmationEmail):
+    pass
+
+
+class UsernameResetEmail(BackgroundEmailMixin, email.UsernameResetEmail):
+    pass
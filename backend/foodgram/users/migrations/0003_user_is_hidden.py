@@ -0,0 +1,18 @@
+# Generated by Django 4.1.3 on 2026-10-19 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='is_hidden',
+            field=models.BooleanField(db_index=True, default=False, help_text='Пользователь удаляется в фоне', verbose_name='Скрыт'),
+        ),
+    ]
@@ -21,6 +21,20 @@ class User(AbstractUser):
         'Фамилия  пользователя',
         max_length=150,
     )
+    followers_count = models.IntegerField(
+        'Подписчиков',
+        default=0
+    )
+    recipes_count = models.IntegerField(
+        'Рецептов',
+        default=0
+    )
+    is_hidden = models.BooleanField(
+        'Скрыт',
+        default=False,
+        db_index=True,
+        help_text='Пользователь удаляется в фоне'
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
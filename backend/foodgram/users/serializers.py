@@ -1,3 +1,4 @@
+from api.mixins import SparseFieldsSerializerMixin
 from djoser.serializers import UserCreateSerializer
 from recipe.models import Recipe
 from rest_framework import serializers
@@ -5,7 +6,7 @@ from rest_framework import serializers
 from .models import Follow, User
 
 
-class CustomUserSerializer(UserCreateSerializer):
+class CustomUserSerializer(SparseFieldsSerializerMixin, UserCreateSerializer):
     """
     Сериализатор представления пользователя.
     """
@@ -17,8 +18,10 @@ class CustomUserSerializer(UserCreateSerializer):
                   'is_subscribed')
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
-        if user.is_authenticated:
+        if user.is_authenticated and user.pk != obj.pk:
             return Follow.objects.filter(user=user, author=obj.id).exists()
         return False
 
@@ -56,10 +59,10 @@ class FollowSerializer(CustomUserSerializer):
 
     def get_recipes(self, obj):
         limit_param = self.context['request'].query_params
-        count_recipes = int(limit_param.get('recipes_limit',
-                                            obj.recipes.count()))
-        queryset = obj.recipes.all()[:count_recipes]
+        queryset = obj.recipes.filter(is_hidden=False)
+        if 'recipes_limit' in limit_param:
+            queryset = queryset[:int(limit_param['recipes_limit'])]
         return FavoriteRecipeSerializer(many=True).to_representation(queryset)
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return getattr(obj, 'recipes_total', obj.recipes_count)
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from foodgram.cache import namespace
+
+from .models import User
+
+ME_CACHE_KEY = 'me:{}'
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    namespace('users').delete(ME_CACHE_KEY.format(instance.pk))
@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from foodgram.tests import LOCMEM_CACHES
+from rest_framework.test import APIClient
+
+from .models import Follow, User
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REPLICA_VIEWS=[],
+                   PROFILER_SAMPLE_RATE=0)
+class UserQueriesTest(TestCase):
+    """
+    Число SQL-запросов на эндпоинтах пользователей (аутентификация
+    не учитывается).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email='me@foodgram.local', username='me',
+            first_name='me', last_name='me'
+        )
+        for number in range(5):
+            author = User.objects.create(
+                email=f'author{number}@foodgram.local',
+                username=f'author{number}',
+                first_name='author', last_name='author'
+            )
+            if number % 2:
+                Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        subscribed = [user['is_subscribed']
+                      for user in response.json()['results']]
+        self.assertEqual(subscribed.count(True), 2)
+
+    def test_retrieve(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/users/{self.user.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_me_cached(self):
+        self.client.get('/api/users/me/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.json()['email'], self.user.email)
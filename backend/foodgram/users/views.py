@@ -1,40 +1,91 @@
+from api.mixins import SparseFieldsMixin
+from api.throttles import SlidingWindowThrottle
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Value
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
+from foodgram.cache import namespace
+from recipe.counters import with_count
+from recipe.models import CounterShard
+from recipe.purge import hide
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotAuthenticated
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
 from .models import Follow, User
 from .serializers import CustomUserSerializer, FollowSerializer
+from .signals import ME_CACHE_KEY
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(SparseFieldsMixin, UserViewSet):
     """
     Вьюсет для работы с пользователями.
     """
-    queryset = User.objects.all()
+    queryset = User.objects.filter(is_hidden=False)
     serializer_class = CustomUserSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    throttle_scope = None
+
+    def get_queryset(self):
+        return self.with_is_subscribed(super().get_queryset().order_by('pk'))
+
+    def with_is_subscribed(self, queryset):
+        user = self.request.user
+        if not self.wants('is_subscribed'):
+            return queryset
+        if not user.is_authenticated:
+            return queryset.annotate(is_subscribed=Value(False))
+        return queryset.annotate(is_subscribed=Exists(
+            Follow.objects.filter(user=user, author=OuterRef('pk'))
+        ))
+
+    def with_recipes_count(self, queryset):
+        if not self.wants('recipes_count'):
+            return queryset
+        return with_count(queryset, CounterShard.RECIPES, 'recipes_total')
+
+    def perform_destroy(self, instance):
+        hide(User, [instance.pk])
+
+    @action(['get', 'put', 'patch', 'delete'], detail=False)
+    def me(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            raise NotAuthenticated
+        if request.method != 'GET':
+            return super().me(request, *args, **kwargs)
+        data = namespace('users').get_or_set(
+            ME_CACHE_KEY.format(request.user.pk),
+            lambda: dict(self.get_serializer(request.user).data),
+            settings.USER_ME_CACHE_TTL
+        )
+        return Response(data)
 
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=[IsAuthenticated],
-            serializer_class=FollowSerializer)
+            serializer_class=FollowSerializer,
+            throttle_classes=[SlidingWindowThrottle],
+            throttle_scope='subscribe')
     def subscribe(self, request, id):
         follow_subscribe = Follow.objects.filter(
             user=request.user,
             author_id=id)
         if request.method == 'POST':
-            author = get_object_or_404(User, id=id)
-            if follow_subscribe.exists():
-                return Response({'errors': 'Вы уже подписаны'},
-                                status=status.HTTP_400_BAD_REQUEST)
+            author = get_object_or_404(self.with_recipes_count(
+                User.objects.filter(is_hidden=False).annotate(
+                    is_subscribed=Value(True))
+            ), id=id)
             if request.user == author:
                 return Response(
                     {'errors': 'Вы не можете подписаться на самого себя'},
                     status=status.HTTP_400_BAD_REQUEST)
-            Follow.objects.create(user=request.user, author=author)
+            _, created = Follow.objects.get_or_create(user=request.user,
+                                                      author=author)
+            if not created:
+                return Response({'errors': 'Вы уже подписаны'},
+                                status=status.HTTP_400_BAD_REQUEST)
             serializer = self.get_serializer(author)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         if follow_subscribe.exists():
@@ -47,7 +98,12 @@ class CustomUserViewSet(UserViewSet):
     @action(detail=False, permission_classes=[IsAuthenticated],
             serializer_class=FollowSerializer)
     def subscriptions(self, request):
-        request = User.objects.filter(following__user=request.user)
+        request = self.with_recipes_count(
+            User.objects.filter(following__user=request.user,
+                                is_hidden=False).annotate(
+                is_subscribed=Value(True)
+            )
+        )
         page = self.paginate_queryset(request)
         if page is not None:
             serializer = self.get_serializer(page, many=True)